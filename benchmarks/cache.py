@@ -0,0 +1,60 @@
+"""
+Time loading a season with and without the on-disk tournament cache.
+
+For each file, the season is parsed without the cache, loaded through
+an empty cache (which parses it and writes the entry), and loaded again
+from the warm cache, with each way of validating entries. The warm
+tournament's results, lineups and scores are checked against the
+freshly parsed one before anything is reported.
+
+   $ python benchmarks/cache.py [season file ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+import rugby
+from rugby.cache import TournamentCache
+from rugby.tournament import Tournament
+
+SEASONS = ["Gallagher Premiership-2019-2020.json", "super-rugby-aotearoa-2020.json"]
+
+
+def best_time(function, repeats=5):
+    """Return the fastest of several runs, and the last result."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def check_same(fresh, cached):
+    for table in ("results_table", "lineup_summary", "score_summary"):
+        pd.testing.assert_frame_equal(getattr(fresh, table)(), getattr(cached, table)())
+
+
+def main(paths=None):
+    if not paths:
+        paths = [os.path.join(rugby.__path__[0], "json_data", season) for season in SEASONS]
+    for path in paths:
+        cold, fresh = best_time(lambda: Tournament.from_json(path, cache=False))
+        print(f"{os.path.basename(path)}")
+        print(f"  no cache:        {cold:.3f} s")
+        for validate in ("hash", "mtime"):
+            with tempfile.TemporaryDirectory() as directory:
+                cache = TournamentCache(directory, validate=validate)
+                miss, _ = best_time(lambda: Tournament.from_json(path, cache=cache), repeats=1)
+                warm, cached = best_time(lambda: Tournament.from_json(path, cache=cache))
+                check_same(fresh, cached)
+            print(f"  {validate:5} miss:      {miss:.3f} s")
+            print(f"  {validate:5} warm:      {warm:.3f} s ({cold / warm:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,59 @@
+"""
+Time the batched player-pair covariance against the per-pair loop it replaced.
+
+The loop calls ``Player.onfield_point_mutual_rate`` for every pairing
+of a home and an away player, as ``Match.player_covariance`` and
+``Tournament.player_covariance`` used to. Both give the same matrices,
+which is checked before anything is timed.
+
+   $ python benchmarks/covariance.py [season file] [matches]
+"""
+
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+
+import rugby
+from rugby.tournament import Tournament
+
+
+def loop_covariance(match):
+    """Compute a match's covariance matrices one pairing at a time."""
+    home = match.lineups['home'].players()
+    away = match.lineups['away'].players()
+    matrix_for = np.zeros((len(home), len(away)))
+    matrix_against = np.zeros((len(home), len(away)))
+    for i, player1 in enumerate(home):
+        for j, player2 in enumerate(away):
+            matrix_for[i, j], matrix_against[i, j] = player1.onfield_point_mutual_rate(player2, match)
+    return matrix_for, matrix_against
+
+
+def timed(function, matches):
+    start = time.perf_counter()
+    results = [function(match) for match in matches]
+    return time.perf_counter() - start, results
+
+
+def main(path=None, count=20):
+    if path is None:
+        path = glob.glob(os.path.join(rugby.__path__[0], "json_data", "Gallagher Premiership-2019-2020.json"))[0]
+    tournament = Tournament.from_json(path, cache=False)
+    matches = [match for match in tournament.matches if hasattr(match, "lineups") and match.scores != None][:count]
+
+    loop_time, expected = timed(loop_covariance, matches)
+    batch_time, results = timed(lambda match: match.player_covariance(), matches)
+    for (loop_for, loop_against), (batch_for, batch_against) in zip(expected, results):
+        np.testing.assert_allclose(batch_for, loop_for, equal_nan=True)
+        np.testing.assert_allclose(batch_against, loop_against, equal_nan=True)
+
+    print(f"{tournament.name} {tournament.season}, {len(matches)} matches")
+    print(f"per-pair loop: {loop_time:.3f} s")
+    print(f"batched:       {batch_time:.3f} s ({loop_time / batch_time:.0f}x)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else None, int(sys.argv[2]) if len(sys.argv) > 2 else 20)
@@ -1,15 +1,94 @@
-from flask_api import FlaskAPI
-app = FlaskAPI(__name__)
-from rugby.models import *
+"""
+Bring an existing rugby database up to date with the current models.
+
+Migrations are applied in order, and each one is only applied once: the
+number of migrations which have been applied to a database is stored in
+SQLite's ``user_version`` pragma. New migrations should be appended to
+``MIGRATIONS``, and never reordered or removed.
+
+Run this script directly to migrate the database given by the
+``RUGBYDB`` environment variable, or the packaged database otherwise::
+
+   $ python migrations.py
+"""
+
+import os
+import sys
+
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.schema import CreateIndex
+
+import rugby
+from rugby.models import Base
+
 if 'RUGBYDB' in os.environ:
     db = os.environ['RUGBYDB']
 else:
     db = f"{rugby.__path__[0]}/rugby.db"
-engine = create_engine(f'sqlite:///{db}')
 
 
-# Adding the new conference map
-try:
-    ConferenceMap.__table__.create(bind = engine)
-except sqlalchemy.exc.OperationalError:
-    pass
+def create_tables(connection):
+    """Create any tables which are missing, for example the conference map."""
+    Base.metadata.create_all(connection, checkfirst=True)
+
+
+def create_indexes(connection):
+    """Add the lookup indexes declared on the models to existing tables."""
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                connection.execute(CreateIndex(index))
+    connection.execute("ANALYZE")
+
+
+MIGRATIONS = [
+    create_tables,
+    create_indexes,
+]
+
+
+def schema_version(connection):
+    """Return the number of migrations which have been applied to the database."""
+    return connection.execute("PRAGMA user_version").scalar()
+
+
+def migrate(engine, target=None):
+    """
+    Apply any outstanding migrations to a database.
+
+    Each migration runs in its own transaction, together with the
+    update to the stored schema version, so an interrupted run can
+    safely be repeated.
+
+    Parameters
+    ----------
+    engine : sqlalchemy.engine.Engine
+       The engine for the database to migrate.
+    target : int, optional
+       The schema version to migrate to. Defaults to the latest.
+
+    Returns
+    -------
+    list
+       The names of the migrations which were applied.
+    """
+    if target is None:
+        target = len(MIGRATIONS)
+    applied = []
+    with engine.connect() as connection:
+        version = schema_version(connection)
+        for number, migration in enumerate(MIGRATIONS[version:target], start=version+1):
+            with connection.begin():
+                migration(connection)
+                connection.execute(f"PRAGMA user_version = {number}")
+            applied.append(migration.__name__)
+    return applied
+
+
+if __name__ == "__main__":
+    engine = create_engine(f'sqlite:///{db}')
+    target = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    for name in migrate(engine, target):
+        print(f"Applied {name}")
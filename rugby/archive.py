@@ -0,0 +1,219 @@
+"""
+Load many seasons of data at once.
+
+An ``Archive`` finds the season files in a directory, loads them in a
+pool of processes, and indexes the matches from every tournament and
+season together, so that questions such as "every match a team has
+played" or "every match in March" can be answered without loading and
+searching each season in turn.
+"""
+
+import glob
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import rugby
+from .tournament import Tournament
+from .ratings import Ratings
+
+
+def _load_season(path, lazy=False, cache=None):
+    """
+    Load one season file, returning the tournament or a description of the error.
+    """
+    try:
+        return path, Tournament.from_json(path, lazy=lazy, cache=cache), None
+    except Exception:
+        return path, None, traceback.format_exc()
+
+
+class Archive():
+    """
+    A collection of tournaments from several season files.
+
+    Parameters
+    ----------
+    tournaments : dict
+       The tournaments, keyed by their name and season.
+    failures : dict, optional
+       The errors raised by any files which could not be loaded, keyed
+       by the path of the file.
+    """
+
+    def __init__(self, tournaments, failures=None):
+        self.tournaments = tournaments
+        self.failures = failures if failures else {}
+        self._build_index()
+
+    @staticmethod
+    def discover(directory=None, pattern="*.json"):
+        """
+        Find the season files in a directory.
+
+        Parameters
+        ----------
+        directory : str, optional
+           The directory to search. Defaults to the data packaged with this library.
+        pattern : str, optional
+           The pattern the names of the files must match.
+        """
+        if directory is None:
+            directory = os.path.join(rugby.__path__[0], "json_data")
+        return sorted(glob.glob(os.path.join(directory, pattern)))
+
+    @classmethod
+    def from_directory(cls, directory=None, pattern="*.json", processes=None, lazy=False, cache=None):
+        """
+        Load every season file in a directory.
+
+        A file which cannot be loaded does not stop the others from
+        loading; its error is recorded in ``failures`` instead.
+
+        Parameters
+        ----------
+        directory : str, optional
+           The directory to search. Defaults to the data packaged with this library.
+        pattern : str, optional
+           The pattern the names of the files must match.
+        processes : int, optional
+           The number of processes to load files with. Defaults to the
+           number of CPUs; 1 loads the files in this process.
+        lazy, cache : optional
+           Passed to ``Tournament.from_json``.
+        """
+        return cls.from_files(cls.discover(directory, pattern), processes=processes, lazy=lazy, cache=cache)
+
+    @classmethod
+    def from_files(cls, paths, processes=None, lazy=False, cache=None):
+        """
+        Load a list of season files; see ``from_directory``.
+        """
+        if processes == 1 or len(paths) < 2:
+            results = [_load_season(path, lazy, cache) for path in paths]
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                results = list(executor.map(_load_season, paths, [lazy] * len(paths), [cache] * len(paths)))
+
+        tournaments = {}
+        failures = {}
+        for path, tournament, error in results:
+            if tournament is None:
+                failures[path] = error
+                continue
+            key = (tournament.name, tournament.season)
+            if key in tournaments:
+                failures[path] = f"{tournament.name} {tournament.season} has already been loaded from another file"
+                continue
+            tournaments[key] = tournament
+        return cls(tournaments, failures)
+
+    def __len__(self):
+        return len(self.tournaments)
+
+    def __getitem__(self, key):
+        return self.tournaments[key]
+
+    def __iter__(self):
+        return iter(self.tournaments.values())
+
+    def seasons(self):
+        """Return the name and season of each tournament, in order."""
+        return sorted(self.tournaments)
+
+    def _build_index(self):
+        """
+        Index every match and fixture by team and by date.
+
+        The player index needs the lineups of every match, so it is only
+        built when it is first used.
+        """
+        self._all = []
+        self._team_index = {}
+        for tournament in self.tournaments.values():
+            for match in tournament.matches + tournament.future:
+                self._all.append(match)
+                for team in (match.teams['home'], match.teams['away']):
+                    self._team_index.setdefault(str(team), []).append(match)
+        dates = pd.to_datetime([match.date for match in self._all]).values
+        self._date_order = np.argsort(dates, kind="stable")
+        self._dates = dates[self._date_order]
+        self._player_index = None
+
+    def _build_player_index(self):
+        self._player_index = {}
+        for match in self._all:
+            if not hasattr(match, "lineups"):
+                continue
+            for name in match.player_index:
+                self._player_index.setdefault(name, []).append(match)
+
+    def team_matches(self, team):
+        """
+        Return every match and fixture involving a team, in every tournament.
+
+        Parameters
+        ----------
+        team : rugby.team.Team or str
+           The team, or its short name.
+        """
+        return list(self._team_index.get(str(team), []))
+
+    def player_matches(self, player):
+        """
+        Return every match in which a player was named in a lineup.
+
+        Parameters
+        ----------
+        player : rugby.player.Player or str
+           The player, or their name.
+        """
+        if self._player_index is None:
+            self._build_player_index()
+        return list(self._player_index.get(getattr(player, "name", player), []))
+
+    def ratings(self, prior=1.0):
+        """
+        Rate every team from the results of every season together.
+
+        See ``rugby.ratings.Ratings`` for the model and ``prior``.
+        """
+        return Ratings(self._all, prior=prior)
+
+    def between(self, start=None, end=None):
+        """
+        Return the matches and fixtures from a range of dates, in date order.
+
+        Parameters
+        ----------
+        start, end : datetime or str, optional
+           The first and last dates to include. Either can be left open.
+        """
+        lower = 0 if start is None else np.searchsorted(self._dates, pd.to_datetime(start).to_datetime64(), side="left")
+        upper = len(self._dates) if end is None else np.searchsorted(self._dates, pd.to_datetime(end).to_datetime64(), side="right")
+        return [self._all[i] for i in self._date_order[lower:upper]]
+
+    def matches(self, team=None, player=None, start=None, end=None):
+        """
+        Return the matches which meet all of the given conditions, in date order.
+
+        Parameters
+        ----------
+        team : rugby.team.Team or str, optional
+           A team which played in the match.
+        player : rugby.player.Player or str, optional
+           A player named in either lineup.
+        start, end : datetime or str, optional
+           The range of dates the match was played in.
+        """
+        matches = self.between(start, end)
+        if team is not None:
+            chosen = {id(match) for match in self.team_matches(team)}
+            matches = [match for match in matches if id(match) in chosen]
+        if player is not None:
+            chosen = {id(match) for match in self.player_matches(player)}
+            matches = [match for match in matches if id(match) in chosen]
+        return matches
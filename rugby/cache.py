@@ -0,0 +1,282 @@
+"""
+An on-disk cache of parsed tournaments.
+
+Building a tournament from a JSON or CSV file is dominated by
+constructing its lineups, and in particular by working out when each
+player was on the field. The cache stores the result of that work for
+each source file as a single ``.npz`` file, with the numerical data
+(shirt numbers, game times and time ranges) held as arrays and
+everything else as a JSON document alongside them, so that later loads
+of an unchanged file can rebuild the tournament without parsing it
+again.
+
+Entries are keyed by a hash of the source file's contents, or
+optionally by its path, size and modification time, which is cheaper to
+check for large files. When the cache grows beyond its size limit the
+least recently used entries are removed.
+
+The cache is used by ``Tournament.from_json`` and
+``Tournament.from_csv`` when the ``RUGBY_CACHE`` environment variable
+gives a cache directory, or when a ``TournamentCache`` is passed to
+them. ``RUGBY_CACHE_LIMIT`` sets the size limit in bytes.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+
+from .match import Lineup
+from .scores import Scores
+from .team import Team
+
+#: The version of the cache format; entries written by other versions are ignored.
+FORMAT = 1
+
+
+def _json_default(obj):
+    """Convert numpy scalars and timestamps for JSON."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+class TournamentCache():
+    """
+    A directory of cached tournaments.
+
+    Parameters
+    ----------
+    directory : str, optional
+       The directory to store the cache in. Defaults to the
+       ``RUGBY_CACHE`` environment variable, or ``~/.cache/rugby``.
+    limit : int, optional
+       The largest total size of the cache in bytes. Defaults to the
+       ``RUGBY_CACHE_LIMIT`` environment variable, or 256 MB.
+    validate : {"hash", "mtime"}
+       Whether an entry is matched to its source file by a hash of the
+       file's contents, or by its path, size and modification time.
+    """
+
+    def __init__(self, directory=None, limit=None, validate="hash"):
+        if directory is None:
+            directory = os.environ.get("RUGBY_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "rugby"))
+        if limit is None:
+            limit = int(os.environ.get("RUGBY_CACHE_LIMIT", 256 * 2**20))
+        if validate not in ("hash", "mtime"):
+            raise ValueError(f"Unknown validation method {validate}")
+        self.directory = directory
+        self.limit = limit
+        self.validate = validate
+
+    def key(self, path, *args):
+        """
+        Produce the key for a source file, and any arguments used to load it.
+        """
+        digest = hashlib.sha256(json.dumps([FORMAT, args], default=str).encode())
+        if self.validate == "hash":
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(2**20), b""):
+                    digest.update(chunk)
+        else:
+            stat = os.stat(path)
+            digest.update(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def load(self, key, cls):
+        """
+        Load a tournament from the cache.
+
+        Returns
+        -------
+        rugby.tournament.Tournament
+           The tournament, or None if it is not in the cache.
+        """
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                arrays = {name: data[name] for name in data.files}
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            return None
+        meta = json.loads(str(arrays.pop("meta")))
+        if meta.get("format") != FORMAT:
+            return None
+        os.utime(path)
+        return decode(cls, meta, arrays)
+
+    def save(self, key, tournament):
+        """
+        Add a tournament to the cache, then remove old entries if the cache is too large.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        meta, arrays = encode(tournament)
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as f:
+                np.savez_compressed(f, meta=np.array(json.dumps(meta, default=_json_default)), **arrays)
+            os.replace(temporary, self._path(key))
+        except BaseException:
+            os.remove(temporary)
+            raise
+        self.evict()
+
+    def entries(self):
+        """List the cache files, with their sizes, from the least to the most recently used."""
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".npz"):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, name, stat.st_size))
+        return [(name, size) for mtime, name, size in sorted(entries)]
+
+    def size(self):
+        """Return the total size of the cache in bytes."""
+        return sum(size for name, size in self.entries())
+
+    def evict(self):
+        """Remove the least recently used entries until the cache is within its size limit."""
+        entries = self.entries()
+        total = sum(size for name, size in entries)
+        for name, size in entries:
+            if total <= self.limit:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+
+    def clear(self):
+        """Remove every entry from the cache."""
+        for name, size in self.entries():
+            os.remove(os.path.join(self.directory, name))
+
+
+def default_cache():
+    """Return the cache given by the ``RUGBY_CACHE`` environment variable, if it is set."""
+    if "RUGBY_CACHE" in os.environ:
+        return TournamentCache()
+    return None
+
+
+def resolve(cache):
+    """
+    Turn the ``cache`` argument of the tournament loaders into a cache.
+
+    None uses the default cache, if there is one, True always uses a
+    cache in the default location, and False disables caching.
+    """
+    if cache is None:
+        return default_cache()
+    if cache is True:
+        return TournamentCache()
+    if cache is False:
+        return None
+    return cache
+
+
+def _encode_team(tournament, team):
+    """Represent a team in the way it would appear in a match record."""
+    if isinstance(team, Team):
+        if getattr(tournament, "teams_dict", {}).get(team.short_name) is team:
+            return team.short_name
+        return team.to_dict()
+    return team
+
+
+def encode(tournament):
+    """
+    Split a tournament into a JSON-serialisable description and a set of arrays.
+    """
+    teams = None
+    if hasattr(tournament, "team_list"):
+        teams = {}
+        for team in tournament.team_list:
+            teams.setdefault(tournament.team_conferences[team.short_name], []).append(team.to_dict())
+    meta = {"format": FORMAT, "name": tournament.name, "season": tournament.season,
+            "teams": teams, "matches": [], "lineups": [], "scores": []}
+    numbers, game_time, range_counts, range_starts, range_ends = [], [], [], [], []
+    for number, match in enumerate(tournament.matches + tournament.future):
+        row = {"date": match.date.isoformat()}
+        for state in ("home", "away"):
+            row[state] = {"team": _encode_team(tournament, match.teams[state]), "score": match.score[state]}
+        for attribute, key in (("stadium", "stadium"), ("round", "tround"), ("url", "url")):
+            if attribute in match.__dict__:
+                row[key] = match.__dict__[attribute]
+        meta['matches'].append(row)
+
+        if hasattr(match, "lineups"):
+            for state in ("home", "away"):
+                lineup = match.lineups[state]
+                meta['lineups'].append({"match": number, "side": state, "columns": lineup._columns})
+                numbers.append(lineup.numbers)
+                game_time.append(lineup.game_time.astype(float))
+                for name in lineup.names:
+                    ranges = lineup.time_ranges[name]
+                    range_counts.append(len(ranges))
+                    range_starts += [start for start, end in ranges]
+                    range_ends += [end for start, end in ranges]
+
+        if getattr(match, "scores", None) != None:
+            for state in ("home", "away"):
+                scores = match.scores[state]
+                columns = {name: values.tolist() for name, values in scores._columns.items()}
+                if "player" in columns:
+                    # Store the resolved names rather than those in the source file
+                    player = np.array(columns["player"], dtype=object)
+                    player[scores._index] = scores.player
+                    columns["player"] = player.tolist()
+                labels = None if scores._labels is None else scores._labels.tolist()
+                meta['scores'].append({"match": number, "side": state, "columns": columns, "labels": labels})
+
+    lengths = [len(array) for array in numbers]
+    arrays = {"numbers": np.concatenate(numbers) if numbers else np.zeros(0, dtype=int),
+              "game_time": np.concatenate(game_time) if game_time else np.zeros(0),
+              "lineup_lengths": np.array(lengths, dtype=int),
+              "range_counts": np.array(range_counts, dtype=int),
+              "range_starts": np.array(range_starts, dtype=float),
+              "range_ends": np.array(range_ends, dtype=float)}
+    return meta, arrays
+
+
+def decode(cls, meta, arrays):
+    """
+    Rebuild a tournament from the output of ``encode``.
+    """
+    tournament = cls(meta['name'], meta['season'], meta['matches'], meta['teams'])
+    matches = tournament.matches + tournament.future
+    lineups = {}
+
+    offsets = np.concatenate([[0], np.cumsum(arrays['lineup_lengths'])])
+    range_offsets = np.concatenate([[0], np.cumsum(arrays['range_counts'])])
+    starts, ends = arrays['range_starts'].tolist(), arrays['range_ends'].tolist()
+    for i, entry in enumerate(meta['lineups']):
+        lower, upper = offsets[i], offsets[i+1]
+        game_time = arrays['game_time'][lower:upper]
+        if np.all(game_time == np.round(game_time)):
+            game_time = game_time.astype(int)
+        time_ranges = {}
+        for player, name in zip(range(lower, upper), entry['columns']['name']):
+            time_ranges[name] = [[starts[k], ends[k]] for k in range(range_offsets[player], range_offsets[player+1])]
+        lineups.setdefault(entry['match'], {})[entry['side']] = Lineup.from_state(
+            arrays['numbers'][lower:upper], entry['columns'], game_time, time_ranges)
+    for number, sides in lineups.items():
+        matches[number].lineups = sides
+        matches[number]._index_players()
+
+    scores = {}
+    for entry in meta['scores']:
+        scores.setdefault(entry['match'], {})[entry['side']] = Scores.from_columns(entry['columns'], entry['labels'])
+    for number, sides in scores.items():
+        matches[number].scores = sides
+
+    return tournament
@@ -0,0 +1,85 @@
+"""
+Batched scoring rates for pairs of players.
+
+The rate for a pair of players is the number of points scored while
+both were on the field, divided by the time they spent on the field
+together. Rather than intersecting the time ranges of each pair in
+turn, the functions here intersect every range of every player in one
+set with every range of every player in another using broadcasting,
+and find the scores inside each intersection in the same way.
+"""
+
+import numpy as np
+
+from . import intervals
+
+
+def score_arrays(scores):
+    """Return the minutes and values of a set of scores as arrays."""
+    return scores.minute.astype(float), scores.value.astype(float)
+
+
+def pair_overlaps(ranges_a, ranges_b):
+    """
+    Intersect the time ranges of every player in one set with those of every player in another.
+
+    As in ``utils.intersections``, ranges which only touch produce a
+    zero-length intersection.
+
+    Returns
+    -------
+    lower, upper : numpy.ndarray
+       The bounds of each intersection, with shape (players in a,
+       players in b, ranges in a, ranges in b).
+    valid : numpy.ndarray
+       A boolean array of the same shape, set where the intersection is not empty.
+    """
+    starts_a, ends_a = intervals.pack(ranges_a)
+    starts_b, ends_b = intervals.pack(ranges_b)
+    lower = np.maximum(starts_a[:, None, :, None], starts_b[None, :, None, :])
+    upper = np.minimum(ends_a[:, None, :, None], ends_b[None, :, None, :])
+    valid = lower <= upper
+    return lower, upper, valid
+
+
+def overlap_points(lower, upper, valid, minutes, values):
+    """
+    Total the points scored inside the intersections from ``pair_overlaps``.
+
+    A score counts if its minute lies within an intersection, including its end points.
+    """
+    if len(minutes) == 0:
+        return np.zeros(valid.shape[:2])
+    inside = valid[..., None] \
+        & (lower[..., None] <= minutes) \
+        & (minutes <= upper[..., None])
+    return inside.any(axis=(2, 3)) @ values
+
+
+def mutual_rates(ranges_a, ranges_b, scores_for, scores_against):
+    """
+    Calculate the scoring rates for every pairing of two sets of players.
+
+    Parameters
+    ----------
+    ranges_a, ranges_b : list
+       The time ranges of each player in the two sets.
+    scores_for, scores_against : Scores
+       The scores for and against the first set of players' team.
+
+    Returns
+    -------
+    rate_for, rate_against : numpy.ndarray
+       The points per minute for and against while each pair was on
+       the field together, with a row for each player in the first
+       set and a column for each in the second. Pairs who were never
+       on the field together have a rate of NaN.
+    """
+    lower, upper, valid = pair_overlaps(ranges_a, ranges_b)
+    time = np.where(valid, upper - lower, 0).sum(axis=(2, 3))
+    points_for = overlap_points(lower, upper, valid, *score_arrays(scores_for))
+    points_against = overlap_points(lower, upper, valid, *score_arrays(scores_against))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate_for = np.where(time > 0, points_for / time, np.nan)
+        rate_against = np.where(time > 0, points_against / time, np.nan)
+    return rate_for, rate_against
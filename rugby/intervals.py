@@ -0,0 +1,197 @@
+"""
+Operations on sets of time ranges.
+
+A player's time on the field is a list of ``[start, end]`` ranges, in
+minutes. The functions here work on the same ranges held as a pair of
+arrays of start and end minutes, sorted by start, so that finding the
+scores which happened while a player was on the field is a binary
+search rather than a comparison of every score with every range.
+
+Ranges are closed: a score in the minute a player joined or left the
+field happens while they were on it, and two ranges which only touch
+intersect in a range of zero length.
+
+The ``*_each`` functions take the ranges of several players at once,
+packed into padded arrays by ``pack``, and answer the same question
+for every player together.
+"""
+
+import numpy as np
+
+
+def to_arrays(ranges):
+    """
+    Convert a list of ``[start, end]`` ranges to arrays of start and end minutes, sorted by start.
+    """
+    if len(ranges) == 0:
+        return np.zeros(0), np.zeros(0)
+    ranges = np.asarray(ranges, dtype=float).reshape(-1, 2)
+    order = np.argsort(ranges[:, 0], kind="stable")
+    return ranges[order, 0], ranges[order, 1]
+
+
+def to_list(starts, ends):
+    """Convert arrays of start and end minutes to a list of ``[start, end]`` ranges."""
+    return [[start, end] for start, end in zip(np.asarray(starts).tolist(), np.asarray(ends).tolist())]
+
+
+def union(starts, ends):
+    """
+    Merge any ranges which overlap or touch.
+
+    Parameters
+    ----------
+    starts, ends : numpy.ndarray
+       The start and end of each range, sorted by start.
+
+    Returns
+    -------
+    starts, ends : numpy.ndarray
+       The disjoint ranges covering the same minutes.
+    """
+    if len(starts) == 0:
+        return starts, ends
+    reach = np.maximum.accumulate(ends)
+    first = np.concatenate([[True], starts[1:] > reach[:-1]])
+    last = np.concatenate([first[1:], [True]])
+    return starts[first], reach[last]
+
+
+def intersection(a, b):
+    """
+    Find the minutes which are in both of two sets of ranges.
+
+    Parameters
+    ----------
+    a, b : tuple
+       The start and end arrays of each set of ranges, sorted by start.
+
+    Returns
+    -------
+    starts, ends : numpy.ndarray
+       The disjoint ranges in both sets.
+    """
+    a_starts, a_ends = union(*a)
+    b_starts, b_ends = union(*b)
+    # The ranges in b which overlap each range in a form a contiguous run
+    first = np.searchsorted(b_ends, a_starts, side="left")
+    stop = np.searchsorted(b_starts, a_ends, side="right")
+    counts = np.maximum(stop - first, 0)
+    rows = np.repeat(np.arange(len(a_starts)), counts)
+    columns = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(first, counts)
+    return union(np.maximum(a_starts[rows], b_starts[columns]), np.minimum(a_ends[rows], b_ends[columns]))
+
+
+def total_length(starts, ends):
+    """Return the number of minutes covered by a set of ranges."""
+    starts, ends = union(starts, ends)
+    return float(np.sum(ends - starts))
+
+
+def contains(starts, ends, minutes):
+    """
+    Find which of a set of minutes fall inside any of a set of ranges.
+
+    Parameters
+    ----------
+    starts, ends : numpy.ndarray
+       The start and end of each range, sorted by start.
+    minutes : numpy.ndarray
+       The minutes to test. Missing (NaN) minutes are never inside a range.
+
+    Returns
+    -------
+    numpy.ndarray
+       A boolean array with an entry for each minute.
+    """
+    minutes = np.asarray(minutes, dtype=float)
+    if len(starts) == 0:
+        return np.zeros(len(minutes), dtype=bool)
+    # The last range starting at or before each minute is the only
+    # candidate, once each end is replaced by the furthest end so far
+    latest = np.searchsorted(starts, minutes, side="right") - 1
+    reach = np.maximum.accumulate(ends)
+    return (latest >= 0) & (minutes <= reach[np.maximum(latest, 0)])
+
+
+def pack(time_ranges):
+    """
+    Pack the time ranges of several players into padded arrays.
+
+    Parameters
+    ----------
+    time_ranges : list
+       A list of time ranges for each player, in the form produced by
+       ``Lineup.time_ranges``. Players who did not play have an empty list.
+
+    Returns
+    -------
+    starts, ends : numpy.ndarray
+       Arrays with a row for each player and a column for each range,
+       sorted by start and padded with NaN.
+    """
+    width = max([len(ranges) for ranges in time_ranges] + [1])
+    starts = np.full((len(time_ranges), width), np.nan)
+    ends = np.full((len(time_ranges), width), np.nan)
+    for i, ranges in enumerate(time_ranges):
+        if len(ranges) > 0:
+            row_starts, row_ends = to_arrays(ranges)
+            starts[i, :len(ranges)] = row_starts
+            ends[i, :len(ranges)] = row_ends
+    return starts, ends
+
+
+def _flatten(starts, ends, minutes=()):
+    """
+    Move each player's ranges into a band of minutes of their own.
+
+    Bands are further apart than the longest span of any of the ranges
+    or minutes, so a single sorted array can hold every player's ranges
+    in order without any two players' ranges overlapping or touching.
+
+    Returns
+    -------
+    starts, ends : numpy.ndarray
+       The shifted ranges, in order of player and then start.
+    rows : numpy.ndarray
+       The player each range belongs to.
+    offsets : numpy.ndarray
+       The shift applied to each player's band.
+    """
+    valid = ~np.isnan(starts)
+    known = np.concatenate([starts[valid], ends[valid], np.asarray(minutes, dtype=float)])
+    known = known[~np.isnan(known)]
+    low, span = (known.min(), known.max() - known.min() + 1) if len(known) else (0, 1)
+    offsets = np.arange(starts.shape[0]) * span - low
+    rows = np.nonzero(valid)[0]
+    return starts[valid] + offsets[rows], ends[valid] + offsets[rows], rows, offsets
+
+
+def contains_each(starts, ends, minutes):
+    """
+    Find which of a set of minutes fall inside the ranges of each of several players.
+
+    Parameters
+    ----------
+    starts, ends : numpy.ndarray
+       The padded ranges of each player, as produced by ``pack``.
+    minutes : numpy.ndarray
+       The minutes to test.
+
+    Returns
+    -------
+    numpy.ndarray
+       A boolean array with a row for each player and a column for each minute.
+    """
+    minutes = np.asarray(minutes, dtype=float)
+    flat_starts, flat_ends, rows, offsets = _flatten(starts, ends, minutes)
+    shifted = minutes[None, :] + offsets[:, None]
+    return contains(flat_starts, flat_ends, shifted.ravel()).reshape(starts.shape[0], len(minutes))
+
+
+def total_length_each(starts, ends):
+    """Return the number of minutes covered by the padded ranges of each player."""
+    flat_starts, flat_ends, rows, offsets = _flatten(starts, ends)
+    merged_starts, merged_ends = union(flat_starts, flat_ends)
+    owners = rows[np.searchsorted(flat_starts, merged_starts)]
+    return np.bincount(owners, weights=merged_ends - merged_starts, minlength=starts.shape[0])
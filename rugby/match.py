@@ -13,13 +13,38 @@ from flask import url_for
 from .player import Player
 from .scores import Scores
 from .utils import json_serial, total_time_from_ranges
+from .covariance import mutual_rates
 from .team import Team
 
+def _normalise_name(name):
+    """Normalise a player's name for matching: lower case, without full stops or extra spaces."""
+    return " ".join(name.replace(".", " ").lower().split())
+
+
+def _name_keys(name):
+    """Return the keys under which a player's name is indexed."""
+    if not isinstance(name, str):
+        return []
+    parts = _normalise_name(name).split()
+    if len(parts) == 0:
+        return []
+    keys = [" ".join(parts), parts[-1]]
+    if len(parts) > 1:
+        keys.append(f"{parts[0][0]} {' '.join(parts[1:])}")
+    return keys
+
+
 class Match(object):
 
-    def __init__(self, row, tournament=None):
+    #: The attributes which are only built when a lazy match is hydrated.
+    LAZY = ("lineups", "scores", "player_index", "_name_keys")
+
+    def __init__(self, row, tournament=None, lazy=False):
         """
         A row from the JSON data file.
+
+        If ``lazy`` is set the row is kept, and the lineups and scores
+        are only built from it when one of them is first used.
         """
 
 
@@ -48,7 +73,7 @@ class Match(object):
 
         if "stadium" in row:
             self.stadium = row["stadium"]
-        if hasattr(row, "tround"):
+        if "tround" in row:
             self.round = row['tround']
 
         # Store tournament metadata
@@ -61,36 +86,98 @@ class Match(object):
         else:
             self.season = None
             self.tournament = None
-            
+
+        try:
+            self.url = row['url']
+        except (KeyError, TypeError):
+            self.url = None
+
+        if lazy:
+            self._row = row
+        else:
+            self._hydrate(row)
+
+    def __getattr__(self, name):
+        if name in self.LAZY and "_row" in self.__dict__:
+            self._hydrate(self.__dict__.pop("_row"))
+            return getattr(self, name)
+        raise AttributeError(name)
+
+    def _hydrate(self, row):
+        """
+        Build the lineups and scores from a row of the JSON data file.
+        """
         # Handle the lineups
+        self.player_index = {}
+        self._name_keys = {"home": {}, "away": {}}
         if "lineup" in row['home']:
             self.lineups = {'home': Lineup(row['home']['lineup']),
                             'away': Lineup(row['away']['lineup'])
             }
+            self._index_players()
 
         if "scores" in row['home']:
             # Handle the scores
             self.scores = {'home': Scores(row['home']['scores']),
                            'away': Scores(row['away']['scores'])
             }
-            for i, score in self.scores['home'].scores.iterrows():
-                if score['player']==None:
-                    continue
-                self.scores['home'].scores.at[i, 'player'] = (self.find_player(score['player']))
-            for i, score in self.scores['away'].scores.iterrows():
-                self.scores['away'].scores.at[i, 'player'] = (self.find_player(score['player']))
+            for state in ("home", "away"):
+                self.scores[state].player[:] = [self.find_player(player, state) for player in self.scores[state].player]
                 
         else:
             self.scores = None
-        try:
-            self.url = row.url
-        except:
-            self.url = None
 
-    def find_player(self, search):
-        for i, player in pd.concat([self.lineups['home'].lineup, self.lineups['away'].lineup]).iterrows():
-            if search in player['name']: 
-                return player['name']
+    def _index_players(self):
+        """
+        Index the players in the lineups by name.
+
+        ``player_index`` maps each name to its side and its row in that
+        side's lineup. For each side, the name keys map the normalised
+        full name, the initial and surname, and the surname of each
+        player to their name, so that the abbreviated names used in some
+        scoring data can be resolved; keys shared by more than one
+        player on a side map to None. Lineup places without a name, as
+        in matches loaded from CSV, are not indexed.
+        """
+        for state in ("home", "away"):
+            keys = self._name_keys[state]
+            for i, name in enumerate(self.lineups[state].names):
+                if not isinstance(name, str):
+                    continue
+                self.player_index.setdefault(name, (state, i))
+                for key in _name_keys(name):
+                    keys[key] = name if keys.get(key, name) == name else None
+
+    def find_player(self, search, state=None):
+        """
+        Find the full name of a player in either lineup.
+
+        Parameters
+        ----------
+        search : str
+           The player's name, which may be abbreviated to their surname,
+           or to an initial and surname.
+        state : {"home", "away"}, optional
+           The side to search first, for example the side which scored.
+
+        Returns
+        -------
+        str
+           The name as it appears in the lineup, or None if no player
+           matches.
+        """
+        if not isinstance(search, str):
+            return None
+        key = _normalise_name(search)
+        for side in ((state, "away" if state == "home" else "home") if state else ("home", "away")):
+            if search in self.player_index and self.player_index[search][0] == side:
+                return search
+            name = self._name_keys[side].get(key)
+            if name:
+                return name
+        for name in self.player_index:
+            if search in name:
+                return name
             
     def all_scores(self):
         """
@@ -212,13 +299,19 @@ class Match(object):
     def player_covariance(self):
         """
         Get the "covariance matrix" for players in this match.
+
+        Returns
+        -------
+        matrix_for, matrix_against : numpy.ndarray
+           The rate at which the home and the away team scored while
+           each pairing of a home player (rows) and an away player
+           (columns) was on the field.
         """
-        matrix_for = np.zeros((len(self.lineups['home'].players()), len(self.lineups['away'].players())))
-        matrix_against = np.zeros((len(self.lineups['home'].players()), len(self.lineups['away'].players())))
-        for i, player1 in enumerate(self.lineups['home'].players()):
-            for j, player2 in enumerate(self.lineups['away'].players()):
-                matrix_for[i,j], matrix_against[i,j] = player1.onfield_point_mutual_rate(player2, self)
-        return matrix_for, matrix_against
+        home = self.lineups['home']
+        away = self.lineups['away']
+        return mutual_rates([home.time_ranges[name] for name in home.names],
+                            [away.time_ranges[name] for name in away.names],
+                            self.scores['home'], self.scores['away'])
             
     def __repr__(self):
         layout = f"""{self.date:%Y-%m-%d %H:%M} {self.teams['home']} {self.score['home']:>3} v {self.score['away']:<3} {self.teams['away']}"""
@@ -248,22 +341,156 @@ class Match(object):
 
 
 class Lineup(object):
+    """
+    Represent a team's lineup.
+
+    The shirt numbers, names and game times are held as arrays, in
+    order of shirt number. A DataFrame of the lineup is only built when
+    the ``lineup`` attribute is first used.
+    """
+
+    __slots__ = ("numbers", "names", "game_time", "time_ranges", "occupancy", "_columns", "_lineup")
+
+    #: The length of a match in minutes, excluding stoppage time.
+    MINUTES = 80
+
     def __init__(self, data):
-        """
-        Represent a team's lineup
-        """
-        self.lineup = pd.DataFrame.from_dict(data, orient='index')
-        # print(self.lineup.name.values)
-        self.lineup.index = np.array(self.lineup.index, dtype=int)
-        self.lineup.sort_index(inplace=True)
-        
-        self.lineup['game time'] = 0
+        numbers = np.array(list(data.keys()), dtype=int)
+        order = np.argsort(numbers, kind="stable")
+        records = list(data.values())
+        columns = {}
+        for i, record in enumerate(records[j] for j in order):
+            for key in record.keys():
+                if key not in columns:
+                    columns[key] = [np.nan] * i
+            for key in columns:
+                columns[key].append(record.get(key, np.nan))
+        self.numbers = numbers[order]
+        self._columns = columns
+        self._lineup = None
+
+        game_time = []
         self.time_ranges = {}
-        for key, value in self.lineup.iterrows():
-            time_range, total_time = self._time_ranges(value)
+        for name, on, off in zip(columns['name'], columns['on'], columns['off']):
+            time_range, total_time = self._time_ranges({"on": on, "off": off})
             if pd.isna(total_time): total_time = 0
-            self.lineup.at[key, 'game time'] = total_time
-            self.time_ranges[value['name']] = time_range
+            game_time.append(total_time)
+            self.time_ranges[name] = time_range
+
+        self.names = list(columns['name'])
+        self.game_time = np.array(game_time)
+        if np.all(self.game_time == np.round(self.game_time)):
+            self.game_time = self.game_time.astype(int)
+        self.occupancy = self._occupancy()
+
+    @classmethod
+    def from_state(cls, numbers, columns, game_time, time_ranges):
+        """
+        Rebuild a lineup from its arrays, without parsing the substitution times again.
+
+        Parameters
+        ----------
+        numbers : numpy.ndarray
+           The shirt numbers, in order.
+        columns : dict
+           The lineup data, as lists in shirt number order.
+        game_time : numpy.ndarray
+           The game time of each player.
+        time_ranges : dict
+           The time ranges of each player, keyed by name.
+        """
+        lineup = cls.__new__(cls)
+        lineup.numbers = numbers
+        lineup._columns = columns
+        lineup._lineup = None
+        lineup.names = list(columns['name'])
+        lineup.game_time = game_time
+        lineup.time_ranges = time_ranges
+        lineup.occupancy = lineup._occupancy()
+        return lineup
+
+    @property
+    def lineup(self):
+        """The lineup as a DataFrame, indexed by shirt number."""
+        if self._lineup is None:
+            self._lineup = pd.DataFrame(self._columns, index=self.numbers)
+            self._lineup['game time'] = self.game_time
+        return self._lineup
+
+    def _occupancy(self):
+        """
+        Build a bitmap of the minutes each player spent on the field.
+
+        Row i is the player at position i of the lineup, and column m
+        is set if they were on the field from minute m to m+1. The
+        bitmap covers the full 80 minutes and any stoppage time in the
+        lineup, plus one final column which is never set.
+        """
+        ends = [end for name in self.names for start, end in self.time_ranges[name] if not pd.isna(end)]
+        width = int(np.ceil(max([self.MINUTES] + ends))) + 1
+        occupancy = np.zeros((len(self.names), width), dtype=bool)
+        for row, name in enumerate(self.names):
+            for start, end in self.time_ranges[name]:
+                if pd.isna(start) or pd.isna(end):
+                    continue
+                occupancy[row, int(start):int(end)] = True
+        return occupancy
+
+    def on_field(self, minute):
+        """Return the names of the players who were on the field during a given minute."""
+        column = min(int(minute), self.occupancy.shape[1]-1)
+        return [name for name, on in zip(self.names, self.occupancy[:, column]) if on]
+
+    def overlap_minutes(self, other=None):
+        """
+        Count the minutes each pair of players spent on the field together.
+
+        Parameters
+        ----------
+        other : Lineup, optional
+           The lineup to pair this lineup's players with. Defaults to this lineup.
+
+        Returns
+        -------
+        numpy.ndarray
+           An array with a row for each player in this lineup and a
+           column for each player in the other.
+        """
+        if other is None:
+            other = self
+        width = max(self.occupancy.shape[1], other.occupancy.shape[1])
+        mine = np.pad(self.occupancy, ((0, 0), (0, width-self.occupancy.shape[1])))
+        theirs = np.pad(other.occupancy, ((0, 0), (0, width-other.occupancy.shape[1])))
+        return mine.astype(int) @ theirs.T.astype(int)
+
+    def score_mask(self, minutes):
+        """
+        Find which players were on the field when each of a set of scores happened.
+
+        As in ``Scores.in_times`` a score at minute m is credited both
+        to players who left and to players who joined the field at m.
+
+        Returns
+        -------
+        numpy.ndarray
+           A boolean array with a row for each player and a column for each score.
+        """
+        last = self.occupancy.shape[1]-1
+        minutes = np.asarray(minutes, dtype=int)
+        return self.occupancy[:, np.clip(minutes, 0, last)] | self.occupancy[:, np.clip(minutes-1, 0, last)]
+
+    def points_while_on(self, scores):
+        """
+        Total the points from a set of scores which each player was on the field for.
+
+        Parameters
+        ----------
+        scores : Scores
+           The scoring events, for example ``match.scores['home']``.
+        """
+        minutes = scores.minute.astype(float)
+        played = ~np.isnan(minutes)
+        return self.score_mask(minutes[played]) @ scores.value[played].astype(float)
 
     @classmethod
     def _time_ranges(cls, value):
@@ -295,7 +522,7 @@ class Lineup(object):
                 value['off'] = [float(value['off'])]
 
         if not pd.isna(value['on']).any() and not pd.isna(value['off']).any() and len(value['on'])>len(value['off']):
-            value['off'] += [80]
+            value['off'] = value['off'] + [80]
 
         try:
             if not pd.isna(value['on']).any() and pd.isna(value['off']).any():
@@ -304,42 +531,51 @@ class Lineup(object):
             print(value)
 
         try:
-            if len(value['on'])<len(value['off']): value['off']+=[80]
+            if len(value['on'])<len(value['off']): value['off'] = value['off'] + [80]
         except TypeError:
             print(value)
         subs = sorted(value['on'] + value['off'])
         if len(subs)%2: subs.append(80)
         return total_time_from_ranges(subs)
 
-    def player_covariance(self):
+    def player_covariance(self, scores_for, scores_against):
         """
         Get the "covariance matrix" for players in this lineup.
+
+        Parameters
+        ----------
+        scores_for, scores_against : Scores
+           The scores for and against this lineup's team.
+
+        Returns
+        -------
+        numpy.ndarray
+           The scoring rate for each pairing of players in the upper
+           triangle, and the negative of the conceding rate in the
+           lower triangle.
         """
-        players = self.players()
-        matrix = np.zeros((len(players), len(players)))
-        for i, player1 in enumerate(players):
-            for j, player2 in enumerate(players):
-                if i==j: 
-                    matrix[i,j] = np.nan
-                if i<j:
-                    matrix[i,j] = player1.onfield_point_mutual_rate(player2, self)[0]
-                if i>j:
-                    matrix[i,j] = - player1.onfield_point_mutual_rate(player2, self)[1]
+        ranges = [self.time_ranges[name] for name in self.names]
+        rate_for, rate_against = mutual_rates(ranges, ranges, scores_for, scores_against)
+        upper = np.triu(np.ones(rate_for.shape, dtype=bool), 1)
+        matrix = np.where(upper, rate_for, -rate_against)
+        np.fill_diagonal(matrix, np.nan)
         return matrix
     
     def players(self):
-        players = [Player(**dict(player)) for i, player in self.lineup.iterrows()]
+        players = [Player(name) for name in self.names]
         return players
 
     def to_dict(self):
         """Represent this lineup as a dict."""
-        return self.lineup[['name', 'on', 'off', 'reds', 'yellows']].T.to_dict()
+        fields = ['name', 'on', 'off', 'reds', 'yellows']
+        return {int(number): {field: self._columns[field][i] for field in fields}
+                for i, number in enumerate(self.numbers)}
     
     
     def __repr__(self):
         out = []
-        for key, value in self.lineup.iterrows():
-            out.append("{a}\t{b[name]}\t{b[game time]}".format(a=key, b=value))
+        for key, name, game_time in zip(self.numbers, self.names, self.game_time):
+            out.append("{a}\t{b}\t{c}".format(a=key, b=name, c=game_time))
             if key == 15:
                 out.append("---"*5)
         return ("\n").join(out) #, "\n")
@@ -1,12 +1,18 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
 
 from sqlalchemy import create_engine
+from sqlalchemy.orm import relationship, joinedload, selectinload, make_transient_to_detached
+from sqlalchemy.inspection import inspect
 from sqlalchemy.orm.exc import NoResultFound
 
 from sqlalchemy import or_
 
+from collections import OrderedDict
 from datetime import datetime, timedelta
+import threading
+
+import pandas as pd
 
 Base = declarative_base()
 
@@ -33,6 +39,131 @@ from flask_sqlalchemy_session import current_session as session
 
 import rugby.data
 
+LOADERS = {"selectin": selectinload, "joined": joinedload}
+
+def load_options(load, *paths):
+    """
+    Produce query options which eagerly load relationships.
+
+    Parameters
+    ----------
+    load : str or None
+       The loading strategy to use, either "selectin" or "joined".
+       If None the relationships are left to load lazily.
+    paths : relationship attributes, or tuples of them
+       The relationships to load. A tuple describes a chain of
+       relationships, for example ``(Match.season, Season.tournament)``.
+    """
+    if not load:
+        return []
+    loader = LOADERS[load]
+    options = []
+    for path in paths:
+        if not isinstance(path, tuple):
+            path = (path,)
+        option = loader(path[0])
+        for attribute in path[1:]:
+            option = getattr(option, loader.__name__)(attribute)
+        options.append(option)
+    return options
+
+class ReferenceCache():
+    """
+    A bounded, process-wide cache for reference rows such as teams and players.
+
+    Rows are held as their column values, keyed both by id and by their
+    natural key, and are merged into the caller's session when they are
+    read, so that a hit does not touch the database. The least recently
+    used rows are evicted once the cache holds more than ``size`` keys.
+
+    Parameters
+    ----------
+    size : int
+       The maximum number of keys to hold.
+    """
+
+    def __init__(self, size=1024):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, cls, session, query, **key):
+        """
+        Find a row, loading it with ``query`` if it is not in the cache.
+
+        Parameters
+        ----------
+        cls : model class
+           The model the row belongs to.
+        session : sqlalchemy.orm.Session
+           The session the returned row should be attached to.
+        query : callable
+           Called with no arguments to load the row on a miss.
+        key : 
+           The column values identifying the row, e.g. ``shortname="Blues"``.
+        """
+        entry = (cls, tuple(sorted(key.items())))
+        with self._lock:
+            values = self._entries.get(entry)
+            if values is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(entry)
+        if values is None:
+            row = query()
+            if row is not None:
+                self.store(row)
+            return row
+        row = cls(**values)
+        make_transient_to_detached(row)
+        return session.merge(row, load=False)
+
+    def store(self, row):
+        """Add a row to the cache under its id and its natural key."""
+        cls = type(row)
+        values = {column.key: getattr(row, column.key) for column in inspect(cls).column_attrs}
+        entries = [(cls, (("id", row.id),)),
+                   (cls, tuple(sorted((name, values[name]) for name in cls.natural_key)))]
+        with self._lock:
+            self._forget(cls, row.id)
+            self._keys[(cls, row.id)] = entries
+            for entry in entries:
+                self._entries[entry] = values
+                self._entries.move_to_end(entry)
+            while len(self._entries) > self.size:
+                (evicted, _), row_values = self._entries.popitem(last=False)
+                # Drop the row's other key with it, so that both maps stay bounded
+                self._forget(evicted, row_values["id"])
+
+    def invalidate(self, row):
+        """Drop every cached key for a row which has been changed or removed."""
+        with self._lock:
+            self._forget(type(row), row.id)
+
+    def _forget(self, cls, id):
+        for entry in self._keys.pop((cls, id), []):
+            self._entries.pop(entry, None)
+
+    def clear(self):
+        """Empty the cache and reset its counters."""
+        with self._lock:
+            self._entries.clear()
+            self._keys.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Return the hit and miss counts, and the current and maximum number of keys."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "keys": len(self._entries), "size": self.size}
+
+reference_cache = ReferenceCache(size=int(os.environ.get('RUGBY_CACHE_SIZE', 1024)))
+
 class User(Base):
     __tablename__ = 'user'
     id = Column(Integer, primary_key=True)
@@ -74,9 +205,12 @@ class User(Base):
 
 class Tournament(Base):
     __tablename__ = 'tournament'
+    __table_args__ = (Index("ix_tournament_name", "name"),)
     id = Column(Integer, primary_key=True)
     name = Column(String(250), nullable=False)
 
+    natural_key = ("name",)
+
     def to_dict(self):
         return {"name": self.name}
 
@@ -86,27 +220,31 @@ class Tournament(Base):
         if 'name' in data:
             tournament.name = data['name']
         session.commit()
+        reference_cache.invalidate(tournament)
         return tournament
     
     @classmethod
     def all(cls, session=session):
         return session.query(cls).all()
     @classmethod
-    def get(cls, id):
-        try:
-            return session.query(cls).filter_by(id=id).one()
-        except NoResultFound:
-            return None
+    def get(cls, id, session=session):
+        def query():
+            try:
+                return session.query(cls).filter_by(id=id).one()
+            except NoResultFound:
+                return None
+        return reference_cache.lookup(cls, session, query, id=id)
         
     @classmethod
     def from_query(self, name, session=session):
-        tournament = session.query(Tournament).filter_by(name=name).one()
-        return tournament
+        query = lambda: session.query(Tournament).filter_by(name=name).one()
+        return reference_cache.lookup(Tournament, session, query, name=name)
 
     @classmethod
     def remove(cls, name, session=session):
         tournaments = session.query(Tournament).filter_by(name=name).all()
         for tournament in tournaments:
+            reference_cache.invalidate(tournament)
             session.delete(tournament)
         session.commit()
         return {}
@@ -122,17 +260,21 @@ class Tournament(Base):
             tournament = Tournament(name=tournament['name'])
             session.add(tournament)
             session.commit()
+            reference_cache.invalidate(tournament)
         return tournament
 
 class Season(Base):
     __tablename__ = "season"
+    __table_args__ = (Index("ix_season_tournament_name", "tournament", "name"),)
     id = Column(Integer, primary_key=True)
     name = Column(String(250), nullable=False)
-    tournament = Column(Integer, ForeignKey("tournament.id"))
+    tournament_id = Column("tournament", Integer, ForeignKey("tournament.id"))
+
+    tournament = relationship("Tournament")
 
     def to_dict(self):
         return {"name": self.name,
-                "tournament": Tournament.get(self.tournament).to_dict()
+                "tournament": self.tournament.to_dict()
         }
     
     @classmethod
@@ -143,36 +285,36 @@ class Season(Base):
             return None
     
     @classmethod
-    def all(cls, session=session):
-        return session.query(cls).all()
+    def all(cls, session=session, load="joined"):
+        return session.query(cls).options(*load_options(load, cls.tournament)).all()
     
     @classmethod
     def add(self, tournament, session=session):
         tournament_id = Tournament.add(tournament).id
         try:
             if isinstance(tournament, rugby.data.Tournament):
-                season = session.query(Season).filter_by(name=tournament.season, tournament=tournament_id).one()
+                season = session.query(Season).filter_by(name=tournament.season, tournament_id=tournament_id).one()
             else:
-                season = session.query(Season).filter_by(name=tournament['season'], tournament=tournament_id).one()
+                season = session.query(Season).filter_by(name=tournament['season'], tournament_id=tournament_id).one()
         except NoResultFound:
-            season = Season(name=tournament['season'], tournament=tournament_id)
+            season = Season(name=tournament['season'], tournament_id=tournament_id)
             session.add(season)
             session.commit()
         return season
     
     @classmethod
-    def from_query(self, tournament, season=None, session=session):
+    def from_query(self, tournament, season=None, session=session, load="joined"):
         tournament = session.query(Tournament).filter_by(name=tournament).one()
 
         if season:
-            season = session.query(Season).filter_by(name=season, tournament=tournament.id).one()
+            season = session.query(Season).filter_by(name=season, tournament_id=tournament.id).one()
 
             conferences = ConferenceMap.for_season(season)
             
             tournament = rugby.data.Tournament(
                 name=tournament.name,
                 season=season.name, 
-                matches=season.matches(session))
+                matches=season.matches(session, load))
             tournament.season_id = season.id
             
             tournament.team_conferences = conferences
@@ -181,20 +323,35 @@ class Season(Base):
             
             return tournament
         else:
-            seasons = session.query(Season).filter_by(tournament=tournament.id).all()
+            seasons = session.query(Season).filter_by(tournament_id=tournament.id).all()
             return [rugby.data.Tournament(
                 name=tournament.name,
                 season=season.name, 
-                matches=season.matches(session)) for season in seasons]
+                matches=season.matches(session, load)) for season in seasons]
         
     
-    def matches(self, session=session):
-        matches = session.query(Match).filter_by(season=self.id).all()
+    def matches(self, session=session, load="joined"):
+        """
+        Return all of the matches in this season as dictionaries.
+
+        The matches, both teams, the season and its tournament are
+        loaded eagerly, so the number of queries does not grow with
+        the length of the season.
+
+        Parameters
+        ----------
+        load : str, optional
+           The relationship loading strategy, "joined" (the default) or "selectin".
+        """
+        matches = session.query(Match)\
+                         .options(*Match.load_options(load))\
+                         .filter(Match.season_id==self.id).all()
         matches = [match.to_dict(session) for match in matches]
         return matches
 
 class ConferenceMap(Base):
     __tablename__ = "conference_map"
+    __table_args__ = (Index("ix_conference_map_season", "season"),)
     id = Column(Integer, primary_key=True)
     season = Column(Integer, ForeignKey("season.id"))
     team = Column(Integer, ForeignKey("team.id"))
@@ -203,9 +360,10 @@ class ConferenceMap(Base):
     @classmethod
     def for_season(cls, season):
         print("for_season", season)
-        teams = session.query(cls).filter_by(season=season.id).all()
-        mapping = {}
-        mapping = {Team.get(team.team).shortname : team.conference for team in teams}
+        teams = session.query(cls.conference, Team.shortname)\
+                       .join(Team, cls.team==Team.id)\
+                       .filter(cls.season==season.id).all()
+        mapping = {shortname: conference for conference, shortname in teams}
         return mapping
 
     @classmethod
@@ -214,7 +372,7 @@ class ConferenceMap(Base):
         Add a dictionary of teams and conferences to the model.
         """
         tournament_id = session.query(Tournament).filter_by(name=tournament).one().id
-        season_id = session.query(Season).filter_by(name=season, tournament=tournament_id).one().id
+        season_id = session.query(Season).filter_by(name=season, tournament_id=tournament_id).one().id
         for team, conference in mapping.items():
             team_id = session.query(Team).filter_by(shortname=team).one().id
             mapping = cls(season=season_id, team=team_id, conference=conference)
@@ -225,6 +383,7 @@ class ConferenceMap(Base):
     
 class Team(Base):
     __tablename__ = "team"
+    __table_args__ = (Index("ix_team_shortname", "shortname"),)
     id = Column(Integer, primary_key=True)
     name = Column(String(250), nullable=False)
     shortname = Column(String(250), nullable=False)
@@ -233,12 +392,16 @@ class Team(Base):
     color_extra = Column(String(6), nullable=False)
     country = Column(String(250), nullable=False)
 
+    natural_key = ("shortname",)
+
     @classmethod
-    def get(cls, id):
-        try:
-            return session.query(cls).filter_by(id=id).one()
-        except NoResultFound:
-            return None
+    def get(cls, id, session=session):
+        def query():
+            try:
+                return session.query(cls).filter_by(id=id).one()
+            except NoResultFound:
+                return None
+        return reference_cache.lookup(cls, session, query, id=id)
     
     @classmethod
     def all(self):
@@ -246,17 +409,19 @@ class Team(Base):
     
     @classmethod
     def from_query(cls, shortname, session=session):
-        return session.query(cls).filter_by(shortname=shortname).one()
+        query = lambda: session.query(cls).filter_by(shortname=shortname).one()
+        return reference_cache.lookup(cls, session, query, shortname=shortname)
 
     @classmethod
     def remove(cls, shortname, session=session):
-        team = Team.from_query(shortname)
+        team = Team.from_query(shortname, session)
+        reference_cache.invalidate(team)
         session.delete(team)
         session.commit()
     
     @classmethod
     def update(cls, shortname, data, session=session):
-        team = Team.from_query(shortname)
+        team = Team.from_query(shortname, session)
         if 'name' in data:
             team.name = str(data['name']).replace("/", "-").strip()
         if 'shortname' in data:
@@ -266,6 +431,7 @@ class Team(Base):
         if 'color_secondary' in data:
             team.color_secondary = str(data['color_secondary']).strip("#").strip()
         session.commit()
+        reference_cache.invalidate(team)
         return team
     
     @classmethod
@@ -290,6 +456,7 @@ class Team(Base):
             )
             session.add(team)
             session.commit()
+            reference_cache.invalidate(team)
         return team
     
     def to_dict(self):
@@ -303,18 +470,29 @@ class Team(Base):
     
 class Match(Base):
     __tablename__ = "match"
+    __table_args__ = (Index("ix_match_home_away_date", "home", "away", "date"),
+                      Index("ix_match_season_date", "season", "date"))
     id = Column(Integer, primary_key=True)
     date = Column(DateTime)
-    season = Column(Integer, ForeignKey("season.id"))
-    home = Column(Integer, ForeignKey("team.id"))
-    away = Column(Integer, ForeignKey("team.id"))
+    season_id = Column("season", Integer, ForeignKey("season.id"))
+    home_id = Column("home", Integer, ForeignKey("team.id"))
+    away_id = Column("away", Integer, ForeignKey("team.id"))
     home_score = Column(Integer)
     away_score = Column(Integer)
 
+    season = relationship("Season")
+    home = relationship("Team", foreign_keys=[home_id])
+    away = relationship("Team", foreign_keys=[away_id])
+
     @classmethod
-    def all(self):
+    def load_options(cls, load):
+        """The loader options needed to serialise matches without further queries."""
+        return load_options(load, cls.home, cls.away, (cls.season, Season.tournament))
+
+    @classmethod
+    def all(self, load="joined"):
         return [rugby.data.Match(match.to_dict(session)).to_rest()
-                for match in session.query(Match).all()]
+                for match in session.query(Match).options(*Match.load_options(load)).all()]
 
     @classmethod
     def remove(cls, home, away, date, session=session):
@@ -322,7 +500,7 @@ class Match(Base):
         home = Team.from_query(home, session).id
         away = Team.from_query(away, session).id
         match = session.query(Match).filter(
-            Match.date.between(date, date+timedelta(days=1))).filter_by(home=home, away=away).one()
+            Match.date.between(date, date+timedelta(days=1))).filter_by(home_id=home, away_id=away).one()
 
         session.delete(match)
         session.commit()
@@ -333,7 +511,7 @@ class Match(Base):
         home = Team.from_query(home, session).id
         away = Team.from_query(away, session).id
         match = session.query(Match).filter(
-            Match.date.between(date, date+timedelta(days=1))).filter_by(home=home, away=away).one()
+            Match.date.between(date, date+timedelta(days=1))).filter_by(home_id=home, away_id=away).one()
         
         if 'date' in data:
             match.date = datetime.strptime(data['date'], "%Y-%m-%d")
@@ -342,11 +520,11 @@ class Match(Base):
                                              tournament=data['tournament'],
                                              session=session).season_id
             print(season)
-            match.season = int(season)
+            match.season_id = int(season)
         if 'home_team' in data:
-            match.home = Team.from_query(data['home_team'], session).id
+            match.home = Team.from_query(data['home_team'], session)
         if 'away_team' in data:
-            match.away = Team.from_query(data['away_team'], session).id
+            match.away = Team.from_query(data['away_team'], session)
         if 'home_score' in data:
             match.home_score = float(data['home_score'])
         if 'away_score' in data:
@@ -356,7 +534,7 @@ class Match(Base):
 
     
     @classmethod
-    def from_query(self, home, away, date=None, limit=30, session=session):
+    def from_query(self, home, away, date=None, limit=30, session=session, load="joined"):
         
         home = Team.from_query(home, session).id
         away = Team.from_query(away, session).id
@@ -364,15 +542,17 @@ class Match(Base):
         if date:
             date = datetime.strptime(date, "%Y-%m-%d")
         
-            match = session.query(Match).filter(Match.date.between(date, date+timedelta(days=1))).filter_by(home=home, away=away).one()
+            match = session.query(Match).options(*Match.load_options(load))\
+                                        .filter(Match.date.between(date, date+timedelta(days=1)))\
+                                        .filter_by(home_id=home, away_id=away).one()
             match_o = rugby.data.Match(match.to_dict(session))
             match_o.id = match.id
             return match_o
             
 
         else:
-            matches = session.query(Match).filter(
-                (Match.home.in_([home, away]) & (Match.away.in_([home, away])))).order_by(Match.date.desc()).limit(limit)
+            matches = session.query(Match).options(*Match.load_options(load)).filter(
+                (Match.home_id.in_([home, away]) & (Match.away_id.in_([home, away])))).order_by(Match.date.desc()).limit(limit)
             return [rugby.data.Match(match.to_dict(session)).to_rest() for match in matches]
 
     @classmethod
@@ -381,20 +561,20 @@ class Match(Base):
         Add a match object to the database.
         """
         tournament = session.query(Tournament).filter_by(name=match['tournament']).one()
-        season = session.query(Season).filter_by(tournament=tournament.id, name=match['season']).one()
+        season = session.query(Season).filter_by(tournament_id=tournament.id, name=match['season']).one()
         home = Team.from_query(match['home_team'])
         away = Team.from_query(match['away_team'])
 
         try:
-            match = session.query(Match).filter_by(date=match['date'], home=home.id, away=away.id, season=season.id).one()
+            match = session.query(Match).filter_by(date=match['date'], home_id=home.id, away_id=away.id, season_id=season.id).one()
         except NoResultFound:
 
             date=datetime.strptime(match['date'], "%Y-%m-%d")
             
             match = Match(date=date,
-                 season=season.id,
-                  home=home.id,
-                  away=away.id,
+                 season_id=season.id,
+                  home_id=home.id,
+                  away_id=away.id,
                   home_score = match['home_score'],
                           away_score = match['away_score'],
                  )
@@ -408,17 +588,17 @@ class Match(Base):
         Add a match object to the database.
         """
         tournament = session.query(Tournament).filter_by(name=match.tournament).one()
-        season = session.query(Season).filter_by(tournament=tournament.id, name=match.season).one()
+        season = session.query(Season).filter_by(tournament_id=tournament.id, name=match.season).one()
         home = Team.from_query(match.teams['home'].short_name)
         away = Team.from_query(match.teams['away'].short_name)
 
         try:
-            match = session.query(Match).filter_by(date=match.date, home=home.id, away=away.id, season=season.id).one()
+            match = session.query(Match).filter_by(date=match.date, home_id=home.id, away_id=away.id, season_id=season.id).one()
         except NoResultFound:
             match = Match(date=match.date,
-                 season=season.id,
-                  home=home.id,
-                  away=away.id,
+                 season_id=season.id,
+                  home_id=home.id,
+                  away_id=away.id,
                   home_score = match.score['home'],
                           away_score = match.score['away'],
                  )
@@ -427,10 +607,17 @@ class Match(Base):
         return match
     
     def to_dict(self, session=session):
-        season = Season.get(self.season)
-        tournament = Tournament.get(season.tournament)
-        home = rugby.data.Team(**session.query(Team).filter_by(id=self.home).one().to_dict())
-        away = rugby.data.Team(**session.query(Team).filter_by(id=self.away).one().to_dict())
+        """
+        Represent this match as a dictionary.
+
+        The season, tournament and teams are read through the match's
+        relationships, so they should be eagerly loaded with
+        ``Match.load_options`` when serialising many matches.
+        """
+        season = self.season
+        tournament = season.tournament
+        home = rugby.data.Team(**self.home.to_dict())
+        away = rugby.data.Team(**self.away.to_dict())
         if self.home_score:
             home=dict(score=self.home_score, team=home.to_dict())
             away=dict(score=self.away_score, team=away.to_dict())
@@ -447,19 +634,25 @@ class Match(Base):
 
 class Player(Base):
     __tablename__ = 'player'
+    __table_args__ = (Index("ix_player_firstname_surname", "firstname", "surname"),)
     id = Column(Integer, primary_key=True)
     firstname = Column(String(250), nullable=False)
     surname = Column(String(250), nullable=False)
     country = Column(String(250), nullable=True)
+
+    natural_key = ("firstname", "surname")
+
     @classmethod
     def all(cls, session=session):
         return session.query(cls).all()
     @classmethod
-    def get(cls, id):
-        try:
-            return session.query(cls).filter_by(id=id).one()
-        except NoResultFound:
-            return None
+    def get(cls, id, session=session):
+        def query():
+            try:
+                return session.query(cls).filter_by(id=id).one()
+            except NoResultFound:
+                return None
+        return reference_cache.lookup(cls, session, query, id=id)
 
     @property
     def name(self):
@@ -478,7 +671,8 @@ class Player(Base):
         
     @classmethod
     def from_query(cls, firstname, surname, session=session):
-        return session.query(cls).filter_by(firstname=firstname, surname=surname).one()
+        query = lambda: session.query(cls).filter_by(firstname=firstname, surname=surname).one()
+        return reference_cache.lookup(cls, session, query, firstname=firstname, surname=surname)
     
     @classmethod
     def add(self, firstname, surname, country=None,  session=session):
@@ -488,28 +682,35 @@ class Player(Base):
             player = Player(firstname=firstname, surname=surname, country=country)
             session.add(player)
             session.commit()
+            reference_cache.invalidate(player)
         return player
 
 class Position(Base):
     __tablename__ = 'position'
+    __table_args__ = (Index("ix_position_match_team_player", "match", "team", "player", "number"),)
     id = Column(Integer, primary_key=True)
-    match = Column(Integer, ForeignKey("match.id"))
-    team = Column(Integer, ForeignKey("team.id"))
-    player = Column(Integer, ForeignKey("player.id"), nullable=False)
+    match_id = Column("match", Integer, ForeignKey("match.id"))
+    team_id = Column("team", Integer, ForeignKey("team.id"))
+    player_id = Column("player", Integer, ForeignKey("player.id"), nullable=False)
     number = Column(Integer)
     on = Column(String(250))
     off = Column(String(250))
     reds = Column(String(250))
     yellows = Column(String(250))
 
+    match = relationship("Match")
+    team = relationship("Team")
+    player = relationship("Player")
+
     @classmethod
-    def from_query(cls, home, away, date, session=session):
+    def from_query(cls, home, away, date, session=session, load="selectin"):
         home = Team.from_query(home.replace("_", " "), session).id
         away = Team.from_query(away.replace("_", " "), session).id
         date = datetime.strptime(date, "%Y-%m-%d")
         
-        match = session.query(Match).filter(Match.date.between(date, date+timedelta(days=1))).filter_by(home=home, away=away).one()
-        positions = session.query(cls).filter_by(match=match.id).all()
+        match = session.query(Match).filter(Match.date.between(date, date+timedelta(days=1))).filter_by(home_id=home, away_id=away).one()
+        positions = session.query(cls).options(*load_options(load, cls.player))\
+                                      .filter_by(match_id=match.id).all()
 
         out = []
         for position in positions:
@@ -543,11 +744,11 @@ class Position(Base):
                 
             out.append({
                 "number": position.number,
-                "player": Player.get(position.player),
+                "player": position.player,
                 "on": on,
                 "off": off,
                 "time_ranges": time_ranges,
-                "team": position.team
+                "team": position.team_id
                 })
         
         return out
@@ -570,9 +771,9 @@ class Position(Base):
         player = Player.from_query(firstname=firstname, surname=surname, session=session)
         team = Team.from_query(shortname=team, session=session)
         try:
-            position = session.query(cls).filter_by(match=match, team=team.id, player=player.id, number=number).one()
+            position = session.query(cls).filter_by(match_id=match, team_id=team.id, player_id=player.id, number=number).one()
         except NoResultFound:
-            position = cls(match=match, team=team.id, player=player.id, number=number, on=on, off=off, reds=reds, yellows=yellows)
+            position = cls(match_id=match, team_id=team.id, player_id=player.id, number=number, on=on, off=off, reds=reds, yellows=yellows)
             session.add(position)
             session.commit()
         return position
@@ -582,13 +783,17 @@ class EventType(Base):
     id = Column(Integer, primary_key=True)
     name = Column(String(250), unique=True)
     score = Column(Integer, nullable=True)
+
+    natural_key = ("name",)
     
     @classmethod
-    def get(cls, id):
-        try:
-            return session.query(cls).filter_by(id=id).one()
-        except NoResultFound:
-            return None
+    def get(cls, id, session=session):
+        def query():
+            try:
+                return session.query(cls).filter_by(id=id).one()
+            except NoResultFound:
+                return None
+        return reference_cache.lookup(cls, session, query, id=id)
         
     @classmethod
     def add(cls, name, score=None,  session=session):
@@ -598,22 +803,35 @@ class EventType(Base):
             event_type = EventType(name=name, score=score)
             session.add(event_type)
             session.commit()
+            reference_cache.invalidate(event_type)
         return event_type
 
     @classmethod
     def from_query(cls, name, session=session):
-        return session.query(cls).filter_by(name=name).one()
+        query = lambda: session.query(cls).filter_by(name=name).one()
+        return reference_cache.lookup(cls, session, query, name=name)
     
 class Event(Base):
     __tablename__ = "event"
+    __table_args__ = (Index("ix_event_match_team_type", "match", "team", "type", "time"),)
     id = Column(Integer, primary_key=True)
-    type = Column(Integer, ForeignKey("event_type.id"))
+    type_id = Column("type", Integer, ForeignKey("event_type.id"))
     time = Column(Integer, nullable=True)
-    team = Column(Integer, ForeignKey("team.id"))
-    match = Column(Integer, ForeignKey("match.id"))
-    player = Column(Integer, ForeignKey("player.id"), nullable=True)
+    team_id = Column("team", Integer, ForeignKey("team.id"))
+    match_id = Column("match", Integer, ForeignKey("match.id"))
+    player_id = Column("player", Integer, ForeignKey("player.id"), nullable=True)
     score = Column(Integer, nullable=True)
 
+    type = relationship("EventType")
+    team = relationship("Team")
+    match = relationship("Match")
+    player = relationship("Player")
+
+    @classmethod
+    def load_options(cls, load):
+        """The loader options needed to serialise events without further queries."""
+        return load_options(load, cls.type, cls.team, cls.player)
+
     @classmethod
     def get(cls, idn, session=session):
         try:
@@ -624,11 +842,11 @@ class Event(Base):
             return None
     
     def to_rest(self):
-        event_data = {"type": EventType.get(self.type).name,
-                      "team": Team.get(self.team).shortname,
+        event_data = {"type": self.type.name,
+                      "team": self.team.shortname,
                       "time": self.time}
         if self.player:
-           event_data["player"] = Player.get(self.player).name
+           event_data["player"] = self.player.name
         if self.score:
             event_data["score"] = self.score
         event_data['id'] = self.id
@@ -646,11 +864,11 @@ class Event(Base):
             player_id=None
         try:
             if not player:
-                event = session.query(cls).filter_by(match=match.id, time=time, team=team.id, type=event_type.id).one()
+                event = session.query(cls).filter_by(match_id=match.id, time=time, team_id=team.id, type_id=event_type.id).one()
             else:
-                event = session.query(cls).filter_by(match=match.id, time=time, team=team.id, type=event_type.id, player=player.id).one()
+                event = session.query(cls).filter_by(match_id=match.id, time=time, team_id=team.id, type_id=event_type.id, player_id=player.id).one()
         except NoResultFound:
-            event = cls(type=event_type.id, time=time, team=team.id, match=match.id, player=player_id, score=score)
+            event = cls(type_id=event_type.id, time=time, team_id=team.id, match_id=match.id, player_id=player_id, score=score)
             session.add(event)
             session.commit()
         return event
@@ -667,10 +885,11 @@ class Event(Base):
         
     
     @classmethod
-    def from_query(cls, session=session, **kwargs):
+    def from_query(cls, session=session, load="selectin", **kwargs):
         if {"home", "away", "date"} <= set(kwargs.keys()):
             match = Match.from_query(home=kwargs['home'], away=kwargs['away'], date=kwargs['date'])
-            events = session.query(cls).filter_by(match=match.id).all()
+            events = session.query(cls).options(*cls.load_options(load))\
+                                       .filter_by(match_id=match.id).all()
         else:
             return {}
         out = []
@@ -684,8 +903,8 @@ class Event(Base):
         team = Team.from_query(shortname=data['team'])
         event_type = EventType.from_query(name=data['type'])
         
-        event.type = event_type.id
-        event.team = Team.from_query(shortname=data['team']).id
+        event.type = event_type
+        event.team = team
         event.time = data['time']
         # if self.player:
         #    event_data["player"] = Player.from_query(self.player).id
@@ -693,3 +912,164 @@ class Event(Base):
             event.score = data['score']
         session.commit()
         return event
+
+
+def _list_string(value):
+    """Store a list of minutes in the comma-separated form read by Position.from_query."""
+    if isinstance(value, (list, tuple)):
+        return ",".join(str(item) for item in value)
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    return str(value)
+
+def _nullable(value):
+    """Convert a missing (NaN) score to NULL."""
+    if value is None or value != value:
+        return None
+    return value
+
+def ingest(tournament, session=session):
+    """
+    Add a whole tournament to the database in a single transaction.
+
+    The tournament, season, teams, players and event types are resolved
+    once, and the matches, positions and events which are not already
+    in the database are inserted with one batched statement per table.
+    Rows are deduplicated in the same way as the ``add`` methods, so
+    importing the same tournament twice leaves the database unchanged.
+
+    Parameters
+    ----------
+    tournament : rugby.data.Tournament
+       The tournament to add.
+    """
+    try:
+        tournament_row = session.query(Tournament).filter_by(name=tournament.name).one()
+    except NoResultFound:
+        tournament_row = Tournament(name=tournament.name)
+        session.add(tournament_row)
+    session.flush()
+    try:
+        season = session.query(Season).filter_by(name=tournament.season, tournament_id=tournament_row.id).one()
+    except NoResultFound:
+        season = Season(name=tournament.season, tournament_id=tournament_row.id)
+        session.add(season)
+    session.flush()
+
+    # Teams
+    teams = {shortname: id for id, shortname in session.query(Team.id, Team.shortname)}
+    new_teams = {}
+    for team in tournament.teams():
+        if team.short_name in teams or team.short_name in new_teams:
+            continue
+        colors = team.colors or {}
+        new_teams[team.short_name] = dict(name=team.name,
+                                          shortname=team.short_name,
+                                          color_primary=colors.get('primary', '000000').strip("#"),
+                                          color_secondary=colors.get('secondary', '').strip("#"),
+                                          color_extra=colors.get('extra', colors.get('tertiary', '')).strip("#"),
+                                          country=team.country or "")
+    if new_teams:
+        session.execute(Team.__table__.insert(), list(new_teams.values()))
+        teams = {shortname: id for id, shortname in session.query(Team.id, Team.shortname)}
+
+    # Matches
+    all_matches = tournament.matches + tournament.future
+    def match_key(match):
+        return (pd.Timestamp(match.date).to_pydatetime(), teams[str(match.teams['home'])], teams[str(match.teams['away'])])
+    def season_matches():
+        return {(date, home, away): id for id, date, home, away
+                in session.query(Match.id, Match.date, Match.home_id, Match.away_id).filter_by(season_id=season.id)}
+    matches = season_matches()
+    new_matches = {}
+    for match in all_matches:
+        key = match_key(match)
+        if key in matches or key in new_matches:
+            continue
+        new_matches[key] = dict(date=key[0], season=season.id, home=key[1], away=key[2],
+                                home_score=_nullable(match.score['home']),
+                                away_score=_nullable(match.score['away']))
+    if new_matches:
+        session.execute(Match.__table__.insert(), list(new_matches.values()))
+        matches = season_matches()
+
+    # Players
+    def player_name(name):
+        """Split a lineup name into a first name and surname, or return None for a missing or blank name."""
+        if not isinstance(name, str) or not name.split():
+            return None
+        return name.split()[0], " ".join(name.split()[1:])
+    players = {(firstname, surname): id for id, firstname, surname
+               in session.query(Player.id, Player.firstname, Player.surname)}
+    lineups = [(match, state) for match in all_matches if hasattr(match, "lineups") for state in ("home", "away")]
+    new_players = set()
+    for match, state in lineups:
+        for name in match.lineups[state].names:
+            key = player_name(name)
+            if key is not None and key not in players:
+                new_players.add(key)
+    if new_players:
+        session.execute(Player.__table__.insert(),
+                        [dict(firstname=firstname, surname=surname) for firstname, surname in new_players])
+        players = {(firstname, surname): id for id, firstname, surname
+                   in session.query(Player.id, Player.firstname, Player.surname)}
+
+    # Positions
+    positions = set(session.query(Position.match_id, Position.team_id, Position.player_id, Position.number)
+                           .join(Match, Position.match_id==Match.id).filter(Match.season_id==season.id))
+    new_positions = []
+    for match, state in lineups:
+        match_id = matches[match_key(match)]
+        team_id = teams[str(match.teams[state])]
+        for number, row in match.lineups[state].lineup.iterrows():
+            # Unnamed lineup places, as in seasons loaded from CSV, have no player to record
+            name = player_name(row['name'])
+            if name is None:
+                continue
+            player_id = players[name]
+            key = (match_id, team_id, player_id, int(number))
+            if key in positions:
+                continue
+            positions.add(key)
+            new_positions.append(dict(match=match_id, team=team_id, player=player_id, number=int(number),
+                                      on=_list_string(row['on']), off=_list_string(row['off']),
+                                      reds=_list_string(row['reds']), yellows=_list_string(row['yellows'])))
+    if new_positions:
+        session.execute(Position.__table__.insert(), new_positions)
+
+    # Events
+    scored = [(match, state) for match in all_matches if getattr(match, "scores", None)
+              for state in ("home", "away") if len(match.scores[state]) > 0]
+    event_types = {name: id for id, name in session.query(EventType.id, EventType.name)}
+    new_types = {}
+    for match, state in scored:
+        for score_type, value in zip(match.scores[state].type, match.scores[state].value):
+            if score_type not in event_types:
+                new_types[score_type] = dict(name=score_type, score=int(value))
+    if new_types:
+        session.execute(EventType.__table__.insert(), list(new_types.values()))
+        event_types = {name: id for id, name in session.query(EventType.id, EventType.name)}
+
+    events = set(session.query(Event.match_id, Event.time, Event.team_id, Event.type_id, Event.player_id)
+                        .join(Match, Event.match_id==Match.id).filter(Match.season_id==season.id))
+    # Events without a player are deduplicated without regard to the player, as in Event.add
+    unattributed = {key[:4] for key in events}
+    new_events = []
+    for match, state in scored:
+        match_id = matches[match_key(match)]
+        team_id = teams[str(match.teams[state])]
+        for score in match.scores[state].scores.itertuples(index=False):
+            player_id = players.get(player_name(score.player))
+            time = None if pd.isna(score.minute) else int(score.minute)
+            key = (match_id, time, team_id, event_types[score.type], player_id)
+            if (player_id is None and key[:4] in unattributed) or key in events:
+                continue
+            events.add(key)
+            unattributed.add(key[:4])
+            new_events.append(dict(match=match_id, time=time, team=team_id, type=key[3],
+                                   player=player_id, score=int(score.value)))
+    if new_events:
+        session.execute(Event.__table__.insert(), new_events)
+
+    session.commit()
+    return season
@@ -2,8 +2,8 @@
 import pandas as pd
 
 
-from .utils import intersections, total_time_from_ranges
-from .scores import Scores
+from . import intervals
+from .utils import total_time_from_ranges
 
 class Position():
 
@@ -51,7 +51,7 @@ class Player():
         self.name = name
     
     def matches(self, tournament):
-        return [x for x in tournament.matches if (self in x.players())]
+        return tournament.player_matches(self)
     
     def positions(self, tournament):
         positions = tournament.positions()
@@ -59,44 +59,27 @@ class Player():
         return positions
     
     def scores(self, tournament):
-        scores = tournament.scores()
-        player_scores = []
-        for match_score in scores:
-            player_scores += [score for i, score in match_score.scores.iterrows() if score.player in self.name]
-            print(player_scores)
-        return Scores(player_scores)
+        return tournament.player_scores(self)
 
     def _find_position(self, match):
         """
         Find what position this player was playing in for a given match.
         """
-
-        df = match.lineups['home'].lineup
-        position = df[df.name==self.name]
-
-        if len(position)==1:
-            side = match.teams['home']
-
-        else:
-            df = match.lineups['away'].lineup
-            position = df[df.name==self.name]
-            side = match.away
-            
-        if len(position) == 0: 
+        if self.name not in match.player_index:
             return None, None # This player wasn't playing in this match
-        
-        return position.index[0], side
+        state, row = match.player_index[self.name]
+        return match.lineups[state].numbers[row], match.teams[state]
 
     def _get_player_row(self, match):
-        df = pd.concat([match.lineups['home'].lineup, match.lineups['away'].lineup])
-        player_row = df[df.name==self.name]
-        return player_row
+        if self.name not in match.player_index:
+            return match.lineups['home'].lineup.iloc[0:0]
+        state, row = match.player_index[self.name]
+        return match.lineups[state].lineup.iloc[row:row+1]
     
     def time_range(self, match):
-        if self.name in match.lineups['home'].time_ranges:
-            return  match.lineups['home'].time_ranges[self.name]
-        elif self.name in match.lineups['away'].time_ranges:
-            return  match.lineups['away'].time_ranges[self.name]
+        if self.name in match.player_index:
+            state, row = match.player_index[self.name]
+            return match.lineups[state].time_ranges[self.name]
         else:
             return []
 
@@ -111,8 +94,7 @@ class Player():
         """
         results = {}
         for state in ["home", "away"]:
-            on_field = match.scores[state].in_times(self.time_range(match))
-            results[state] = on_field.sum()['value']
+            results[state] = match.scores[state].points_in_times(self.time_range(match))
         if self.name in match.lineups['home'].time_ranges:
             return results['home'], results['away']
         else:
@@ -128,25 +110,27 @@ class Player():
         """Calculate how many points were scored while this player and another were on the pitch."""
 
         results = {}
-        inter = intersections(self.time_range(match), player.time_range(match))
+        inter = intervals.to_list(*self._overlap(player, match))
         for state in ["home", "away"]:
-            on_field = match.scores[state].in_times(inter)
-            try:
-                results[state] = on_field.sum()['value']
-            except KeyError:
+            if len(inter) == 0:
+                # The players were never on the field together
                 results[state] = float("nan")
+            else:
+                results[state] = match.scores[state].points_in_times(inter)
         if self.name in match.lineups['home'].time_ranges:
             return results['home'], results['away']
         else:
             return results['away'], results['home']
 
+    def _overlap(self, player, match):
+        """Find the time ranges when this player and another were both on the field."""
+        return intervals.intersection(intervals.to_arrays(self.time_range(match)),
+                                      intervals.to_arrays(player.time_range(match)))
+
     def onfield_point_mutual_rate(self, player, match):
         """Calculate the rate of point scoring for this player pairing."""
         points = self.onfield_points_mutual(player, match)
-        time = intersections(self.time_range(match), player.time_range(match))
-        total_time = 0
-        for sub in time:
-            total_time += (sub[1] - sub[0])
+        total_time = intervals.total_length(*self._overlap(player, match))
         if total_time > 0: points0 = points[0]/total_time
         else: points0 = float('nan')
         if total_time > 0: points1 = points[1]/total_time
@@ -155,14 +139,14 @@ class Player():
     
     def play_time(self, match):
         """Find this player's game time in a given match."""
-        df = pd.concat([match.lineups['home'].lineup, match.lineups['away'].lineup])
-        return df[df.name==self.name].iloc[0]['game time']
+        state, row = match.player_index[self.name]
+        return match.lineups[state].game_time[row]
         
     
     def total_play_time(self, tournament):
         """Find this player's total game time in a tournament."""
-        df = tournament.lineup_summary()
-        return df[df.name==self.name].sum()['game time']
+        summary = tournament.player_summary()
+        return summary['minutes'][summary.index.get_level_values("player") == self.name].sum()
 
     def __eq__(self, other):
         if isinstance(other, str):
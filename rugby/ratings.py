@@ -0,0 +1,261 @@
+"""
+Team ratings fitted to match results.
+
+A ``Ratings`` object fits a Massey-style model to a set of results,
+taking the margin of each match to be the difference between the two
+teams' ratings plus an advantage for the home side,
+
+    home score - away score = rating[home] - rating[away] + home advantage
+
+and finding the ratings by least squares. Each match is a row of a
+sparse design matrix with three entries, so the fit is a sparse solve
+of the normal equations, whose size depends only on the number of
+teams however many seasons the results span. A small ridge penalty
+pulls the ratings towards zero, so that teams with few results are
+not given extreme ratings, and so that groups of teams which never
+meet, such as the sides in different competitions, can still be rated.
+
+Adding or removing a result changes the normal equations by the
+product of its row with itself, so the ratings can be kept up to date
+as results arrive without refitting every match. ``history`` gives
+the ratings as they stood after each day's results, building up the
+normal equations a day at a time; they have a row for each team
+rather than each match, so each day's ratings are a small dense solve.
+"""
+
+import numpy as np
+import pandas as pd
+import scipy.linalg
+from scipy import sparse
+from scipy.sparse import linalg
+
+
+class Ratings():
+    """
+    Ratings for every team in a set of results.
+
+    Parameters
+    ----------
+    matches : list, optional
+       The matches to fit. Fixtures which have not been played are ignored.
+    prior : float, optional
+       The strength of the penalty pulling each rating towards zero,
+       roughly the number of drawn matches each team is assumed to have
+       played before its first result.
+    """
+
+    HOME = "home advantage"
+
+    def __init__(self, matches=(), prior=1.0):
+        self.prior = prior
+        self.teams = []
+        self._number = {}
+        self._dates = []
+        self._home = []
+        self._away = []
+        self._margins = []
+        # Column 0 of the design matrix is the home advantage, and
+        # column i the (i-1)th team, so new teams are added at the end
+        self._normal = sparse.csr_matrix((1, 1))
+        self._target = np.zeros(1)
+        self._solution = None
+        self._history = None
+        self.add_matches(matches)
+
+    @classmethod
+    def from_tournament(cls, tournament, prior=1.0):
+        """Fit the ratings to the completed matches of a tournament."""
+        return cls(tournament.matches, prior=prior)
+
+    def __len__(self):
+        return len(self._margins)
+
+    @staticmethod
+    def _result(match):
+        """Return the date, teams and margin of a match, or None if it has not been played."""
+        score = match.score
+        if score is None or pd.isna(score['home']) or pd.isna(score['away']):
+            return None
+        return (pd.Timestamp(match.date), str(match.teams['home']), str(match.teams['away']),
+                float(score['home'] - score['away']))
+
+    def _column(self, team):
+        if team not in self._number:
+            self.teams.append(team)
+            self._number[team] = len(self.teams)
+        return self._number[team]
+
+    @staticmethod
+    def _design(home, away, size):
+        """Build the design matrix, with a row for each match and a column for the home advantage and each team."""
+        rows = np.arange(len(home))
+        data = np.concatenate([np.ones(2 * len(home)), -np.ones(len(home))])
+        return sparse.csr_matrix((data, (np.tile(rows, 3), np.concatenate([np.zeros(len(home), dtype=int), home, away]))),
+                                 shape=(len(home), size))
+
+    def _update(self, home, away, margins, sign):
+        """Add (or, with a negative sign, remove) the contribution of some matches to the normal equations."""
+        size = len(self.teams) + 1
+        if self._normal.shape[0] < size:
+            self._normal.resize((size, size))
+            self._target = np.concatenate([self._target, np.zeros(size - len(self._target))])
+        design = self._design(np.asarray(home, dtype=int), np.asarray(away, dtype=int), size)
+        self._normal = self._normal + sign * (design.T @ design)
+        self._target = self._target + sign * (design.T @ np.asarray(margins, dtype=float))
+        self._solution = None
+        self._history = None
+
+    def add_matches(self, matches):
+        """Add the results of several matches, and update the ratings."""
+        results = [result for result in map(self._result, matches) if result is not None]
+        if not results:
+            return self
+        dates, home, away, margins = zip(*results)
+        home = [self._column(team) for team in home]
+        away = [self._column(team) for team in away]
+        self._dates.extend(dates)
+        self._home.extend(home)
+        self._away.extend(away)
+        self._margins.extend(margins)
+        self._update(home, away, margins, +1)
+        return self
+
+    def add(self, match):
+        """Add the result of a match, and update the ratings."""
+        return self.add_matches([match])
+
+    def remove(self, match):
+        """Remove the result of a match, for example one which is being replaced, and update the ratings."""
+        result = self._result(match)
+        if result is None:
+            return self
+        date, home, away, margin = result
+        record = (date, self._number.get(home), self._number.get(away), margin)
+        for i, existing in enumerate(zip(self._dates, self._home, self._away, self._margins)):
+            if existing == record:
+                break
+        else:
+            raise ValueError(f"{match} is not one of the rated results")
+        for values in (self._dates, self._home, self._away, self._margins):
+            del values[i]
+        self._update([record[1]], [record[2]], [margin], -1)
+        return self
+
+    def _solve(self, normal, target):
+        """Solve the penalised normal equations for the home advantage and the ratings."""
+        size = normal.shape[0]
+        if normal[0, 0] == 0:
+            return np.zeros(size)
+        penalty = sparse.diags(np.concatenate([[0.0], np.full(size - 1, float(self.prior))]))
+        return np.atleast_1d(linalg.spsolve((normal + penalty).tocsc(), target))
+
+    @property
+    def solution(self):
+        """The fitted home advantage, followed by the rating of each team in order of ``teams``."""
+        if self._solution is None:
+            self._solution = self._solve(self._normal, self._target)
+        return self._solution
+
+    @property
+    def home_advantage(self):
+        """The number of points a team is expected to gain by playing at home."""
+        return float(self.solution[0])
+
+    def ratings(self):
+        """
+        Return the current rating of each team.
+
+        Returns
+        -------
+        pandas.Series
+           The rating of each team, best first. The difference between
+           two teams' ratings is the margin expected between them at a
+           neutral ground.
+        """
+        ratings = pd.Series(self.solution[1:], index=pd.Index(self.teams, name="team"), name="rating")
+        return ratings.sort_values(ascending=False, kind="stable")
+
+    def predict(self, home, away):
+        """Return the expected margin of a match, as the home score minus the away score."""
+        solution = self.solution
+        return float(solution[0] + solution[self._number[str(home)]] - solution[self._number[str(away)]])
+
+    def history(self):
+        """
+        Find the ratings as they stood after the results of each day.
+
+        The normal equations are built up one date at a time, so the
+        ratings on each date only use the results known by then.
+
+        Returns
+        -------
+        pandas.DataFrame
+           A row for each day on which a match was played, a column for
+           the home advantage, and a column for each team. A team has no
+           rating before its first result.
+        """
+        if self._history is None:
+            self._history = self._build_history()
+        return self._history.copy()
+
+    def _build_history(self):
+        columns = [self.HOME] + self.teams
+        if not self._margins:
+            return pd.DataFrame(columns=columns, index=pd.DatetimeIndex([], name="date"), dtype=float)
+        size = len(self.teams) + 1
+        dates = np.array(self._dates, dtype="datetime64[ns]").astype("datetime64[D]")
+        order = np.argsort(dates, kind="stable")
+        days, starts = np.unique(dates[order], return_index=True)
+        ends = np.concatenate([starts[1:], [len(order)]])
+        home = np.array(self._home, dtype=int)[order]
+        away = np.array(self._away, dtype=int)[order]
+        margins = np.array(self._margins)[order]
+        # Each match adds the outer product of its row of the design
+        # matrix, with entries 1, 1 and -1, to the normal equations
+        entries = np.stack([np.zeros(len(home), dtype=int), home, away], axis=1)
+        cells = (entries[:, :, None] * size + entries[:, None, :]).reshape(len(home), 9)
+        values = np.outer([1, 1, -1], [1, 1, -1]).ravel()
+
+        # Each day's solve is small and dense, however sparse the design
+        normal = np.zeros(size * size)
+        target = np.zeros(size)
+        penalty = np.concatenate([[0.0], np.full(size - 1, float(self.prior))])
+        rows = []
+        for start, end in zip(starts, ends):
+            np.add.at(normal, cells[start:end].ravel(), np.tile(values, end - start))
+            np.add.at(target, home[start:end], margins[start:end])
+            np.add.at(target, away[start:end], -margins[start:end])
+            target[0] += margins[start:end].sum()
+            rows.append(scipy.linalg.cho_solve(scipy.linalg.cho_factor(normal.reshape(size, size) + np.diag(penalty)),
+                                               target))
+        history = pd.DataFrame(np.array(rows), index=pd.DatetimeIndex(days.astype("datetime64[ns]"), name="date"),
+                               columns=columns)
+
+        # The first date each team played on
+        first = np.full(size, len(days))
+        position = np.repeat(np.arange(len(days)), ends - starts)
+        np.minimum.at(first, home, position)
+        np.minimum.at(first, away, position)
+        first[0] = 0
+        return history.where(np.arange(len(days))[:, None] >= first[None, :])
+
+    def rating(self, team, date=None):
+        """
+        Return a team's rating.
+
+        Parameters
+        ----------
+        team : rugby.team.Team or str
+           The team.
+        date : datetime or str, optional
+           The date to give the rating on, using the results up to and
+           including that date. Defaults to the rating after every result.
+        """
+        name = str(team)
+        if name not in self._number:
+            raise KeyError(f"{name} has no rated results")
+        if date is None:
+            return float(self.solution[self._number[name]])
+        history = self.history()
+        row = np.searchsorted(history.index.values, pd.to_datetime(date).to_datetime64(), side="right") - 1
+        return float(history[name].iloc[row]) if row >= 0 else float("nan")
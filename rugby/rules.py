@@ -0,0 +1,81 @@
+"""
+Competition rules for awarding league points.
+"""
+
+import numpy as np
+
+
+class Rules():
+    """
+    The rules used to award league points for a match.
+
+    The defaults are the standard bonus-point system: four points for a
+    win, two for a draw, a bonus point for losing by seven points or
+    fewer, and a bonus point for scoring four or more tries.
+
+    Parameters
+    ----------
+    win, draw, loss : int
+       The points awarded for each result.
+    losing_bonus : int
+       The bonus awarded to a team which loses by no more than ``losing_bonus_margin``.
+    losing_bonus_margin : int
+       The largest losing margin which earns the losing bonus.
+    try_bonus : int
+       The bonus awarded to a team which scores at least ``try_bonus_threshold`` tries.
+    try_bonus_threshold : int
+       The number of tries needed for the try bonus.
+    deductions : dict, optional
+       Points deducted from teams, keyed by their short name.
+    """
+
+    def __init__(self, win=4, draw=2, loss=0,
+                 losing_bonus=1, losing_bonus_margin=7,
+                 try_bonus=1, try_bonus_threshold=4,
+                 deductions=None):
+        self.win = win
+        self.draw = draw
+        self.loss = loss
+        self.losing_bonus = losing_bonus
+        self.losing_bonus_margin = losing_bonus_margin
+        self.try_bonus = try_bonus
+        self.try_bonus_threshold = try_bonus_threshold
+        self.deductions = deductions if deductions else {}
+
+    def match_points(self, score_for, score_against, tries):
+        """
+        Award points for a set of results from one team's point of view.
+
+        All of the arguments can be arrays of any matching shape, so
+        that a whole season, or many simulated seasons, can be scored
+        at once. Missing try counts (NaN) never earn the try bonus.
+
+        Parameters
+        ----------
+        score_for, score_against : array-like
+           The points scored by the team and its opponent.
+        tries : array-like
+           The number of tries scored by the team.
+
+        Returns
+        -------
+        dict
+           Arrays of the wins, draws, losses, bonus points and league
+           points for each result.
+        """
+        score_for = np.asarray(score_for, dtype=float)
+        score_against = np.asarray(score_against, dtype=float)
+        tries = np.asarray(tries, dtype=float)
+
+        won = score_for > score_against
+        drawn = score_for == score_against
+        lost = score_for < score_against
+        bonus = self.losing_bonus * (lost & ((score_against - score_for) <= self.losing_bonus_margin)) \
+            + self.try_bonus * (tries >= self.try_bonus_threshold)
+        points = self.win * won + self.draw * drawn + self.loss * lost + bonus
+        return {"won": won.astype(int), "drawn": drawn.astype(int), "lost": lost.astype(int),
+                "bonus": bonus.astype(int), "points": points.astype(int)}
+
+    def deduction(self, team):
+        """Return the points deducted from a team."""
+        return self.deductions.get(str(team), 0)
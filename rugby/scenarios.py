@@ -0,0 +1,313 @@
+"""
+Exact answers to questions about the rest of a season.
+
+Where ``rugby.simulation`` estimates how likely each finishing position
+is, a ``Scenarios`` object answers questions with certainty: can a team
+still finish in the top two, have they already secured a top-two place,
+and which results do they need?
+
+Only league points are considered. A result is classed by the league
+points it gives each side (for example a home win with a try bonus
+against a losing bonus), so a fixture has a handful of outcomes rather
+than one for every score. Because points difference depends on the
+scores, teams level on points may finish in either order: a team "can
+finish" in a place if it would do so with the tie-breaks in its
+favour, and has "clinched" a place only if it keeps it with the
+tie-breaks against it.
+
+The search is a branch and bound over the remaining fixtures:
+
+* Fixtures against a team whose place relative to the target is
+  already settled are given whichever result is worst (or best) for the
+  other side, without branching.
+* Otherwise only the results which are not dominated are tried; with
+  the standard bonus-point rules these are a win for either side
+  without any bonus points for the loser, and a draw.
+* A branch is abandoned as soon as too many teams are certain to finish
+  above the target, or too few can still reach it, or when the fixtures
+  left hand out more points than the teams below the target can absorb.
+* States which have already been ruled out are remembered, keyed by
+  the points of the teams still to play and the fixtures between them,
+  so that orders of results which lead to the same position, including
+  repeated fixtures between the same teams, are only searched once.
+
+``required`` tries the results of each fixture from the worst for the
+team upwards, and skips any result which is better or worse in every
+respect than one already decided.
+"""
+
+import numpy as np
+
+
+class Scenarios():
+    """
+    The possible outcomes of the remaining fixtures in a tournament.
+
+    Parameters
+    ----------
+    tournament : rugby.tournament.Tournament
+       The tournament.
+    rules : rugby.rules.Rules, optional
+       The rules used to award league points. Defaults to the tournament's rules.
+    """
+
+    def __init__(self, tournament, rules=None):
+        self.rules = rules if rules else tournament.rules
+        table = tournament.league_table(self.rules)
+        self.teams = [str(team) for team in table['team']]
+        self.points = tuple(int(points) for points in table['points'])
+        number = {team: i for i, team in enumerate(self.teams)}
+        self.fixtures = []
+        for match in tournament.future:
+            home, away = str(match.teams['home']), str(match.teams['away'])
+            for team in (home, away):
+                if team not in number:
+                    raise ValueError(f"{team} has fixtures but is not in the league table")
+            self.fixtures.append((number[home], number[away]))
+        self.labels = [f"{match.date:%Y-%m-%d} {match.teams['home']} v {match.teams['away']}"
+                       for match in tournament.future]
+
+        self.outcomes = self._outcomes(self.rules)
+        results = list(self.outcomes)
+        self._lowest = [result for result in results
+                        if not any(other != result and other[0] <= result[0] and other[1] <= result[1]
+                                   for other in results)]
+        self._highest = [result for result in results
+                         if not any(other != result and other[0] >= result[0] and other[1] >= result[1]
+                                    for other in results)]
+        self._most = max(max(home, away) for home, away in results)
+
+    @staticmethod
+    def _outcomes(rules):
+        """
+        Find every distinct pair of league points a fixture can award under a set of rules.
+
+        Returns
+        -------
+        dict
+           A description of each outcome, keyed by the home and away points.
+        """
+        margin = rules.losing_bonus_margin + 1
+        tries = rules.try_bonus_threshold
+        outcomes = {}
+        for difference, result in ((margin, "home win"), (1, "home win"), (0, "draw"),
+                                   (-1, "away win"), (-margin, "away win")):
+            for home_tries in (0, tries):
+                for away_tries in (0, tries):
+                    home = int(rules.match_points(difference, 0, home_tries)['points'])
+                    away = int(rules.match_points(0, difference, away_tries)['points'])
+                    outcomes.setdefault((home, away), f"{result} ({home}-{away})")
+        return outcomes
+
+    def _index(self, team):
+        name = str(team)
+        if name not in self.teams:
+            raise KeyError(f"{name} is not in the league table")
+        return self.teams.index(name)
+
+    def _fixed(self, results):
+        """Turn a dictionary of results, keyed by fixture number or label, into fixture numbers and points."""
+        fixed = {}
+        for fixture, outcome in (results or {}).items():
+            if not isinstance(fixture, (int, np.integer)):
+                fixture = self.labels.index(fixture)
+            if not isinstance(outcome, tuple):
+                outcome = {label: points for points, label in self.outcomes.items()}[outcome]
+            fixed[fixture] = outcome
+        return fixed
+
+    def _setup(self, team, results, best):
+        """
+        Apply the fixed results and the target team's own fixtures.
+
+        The target team takes its best results (or its worst), and its
+        opponents their worst (or best), as nothing else can help it
+        more (or harm it more).
+        """
+        points = list(self.points)
+        remaining = []
+        fixed = self._fixed(results)
+        for number, (home, away) in enumerate(self.fixtures):
+            if number in fixed:
+                outcome = fixed[number]
+            elif team in (home, away):
+                side = 0 if home == team else 1
+                choices = list(self.outcomes)
+                key = (lambda result: (-result[side], result[1-side])) if best \
+                    else (lambda result: (result[side], -result[1-side]))
+                outcome = min(choices, key=key)
+            else:
+                remaining.append((home, away))
+                continue
+            points[home] += outcome[0]
+            points[away] += outcome[1]
+        return points, remaining
+
+    def can_finish(self, team, places, results=None):
+        """
+        Find whether a team can still finish in one of the top places.
+
+        Parameters
+        ----------
+        team : rugby.team.Team or str
+           The team.
+        places : int
+           The number of places, for example the number of playoff places.
+        results : dict, optional
+           Results to assume for some fixtures, keyed by the fixture's
+           number or label, with either the pair of league points or an
+           outcome description from ``outcomes``.
+        """
+        team = self._index(team)
+        points, remaining = self._setup(team, results, best=True)
+        return self._search(points, remaining, points[team], team, places, above=True, failed=set())
+
+    def clinched(self, team, places, results=None):
+        """
+        Find whether a team is certain to finish in one of the top places, whatever the other results.
+
+        The arguments are the same as for ``can_finish``.
+        """
+        team = self._index(team)
+        points, remaining = self._setup(team, results, best=False)
+        return not self._search(points, remaining, points[team], team, places, above=False, failed=set())
+
+    def eliminated(self, team, places, results=None):
+        """Find whether a team can no longer finish in one of the top places."""
+        return not self.can_finish(team, places, results)
+
+    def _search(self, points, remaining, threshold, team, places, above, failed):
+        """
+        Search for results of the remaining fixtures which keep a team in (or push it out of) the top places.
+
+        With ``above`` set, look for results which leave fewer than
+        ``places`` other teams with more points than ``threshold``;
+        otherwise look for results which give at least ``places`` other
+        teams ``threshold`` points or more.
+        """
+        points = list(points)
+        remaining = list(remaining)
+        others = [other for other in range(len(points)) if other != team]
+        while True:
+            most = [0] * len(points)
+            for home, away in remaining:
+                most[home] += self._most
+                most[away] += self._most
+            if above:
+                beaten = sum(1 for other in others if points[other] > threshold)
+                if beaten >= places:
+                    return False
+                settled = [points[other] > threshold or points[other] + most[other] <= threshold
+                           for other in range(len(points))]
+            else:
+                reached = sum(1 for other in others if points[other] >= threshold)
+                if reached >= places:
+                    return True
+                possible = sum(1 for other in others if points[other] < threshold <= points[other] + most[other])
+                if reached + possible < places:
+                    return False
+                settled = [points[other] >= threshold or points[other] + most[other] < threshold
+                           for other in range(len(points))]
+
+            # Results against a settled team only matter to its opponent
+            forced = [(home, away) for home, away in remaining if settled[home] or settled[away]]
+            if not forced:
+                break
+            for home, away in forced:
+                remaining.remove((home, away))
+                if settled[home] and settled[away]:
+                    continue
+                side = 1 if settled[home] else 0
+                outcome = min(self.outcomes, key=lambda result: result[side] if above else -result[side])
+                points[home] += outcome[0]
+                points[away] += outcome[1]
+
+        if not remaining:
+            return above
+        if above and not self._room(points, remaining, threshold, places - 1 - beaten):
+            return False
+
+        # Only the teams with fixtures left can change the outcome
+        playing = sorted({team for fixture in remaining for team in fixture})
+        key = (beaten if above else reached, tuple(points[team] for team in playing), tuple(sorted(remaining)))
+        if key in failed:
+            return False
+        (home, away), rest = remaining[0], remaining[1:]
+        for outcome in (self._lowest if above else self._highest):
+            points[home] += outcome[0]
+            points[away] += outcome[1]
+            found = self._search(points, rest, threshold, team, places, above, failed)
+            points[home] -= outcome[0]
+            points[away] -= outcome[1]
+            if found:
+                return True
+        failed.add(key)
+        return False
+
+    def _room(self, points, remaining, threshold, spare):
+        """
+        Check whether the remaining fixtures can be absorbed without too many teams passing a threshold.
+
+        Every fixture hands out at least a minimum number of points
+        between its two sides, and each team can take only so many
+        before it passes the threshold. Up to ``spare`` teams may pass
+        it, taking their fixtures with them; this is a quick test which
+        can rule a position out, but not prove it possible.
+        """
+        least = min(home + away for home, away in self.outcomes)
+        degree = {}
+        for fixture in remaining:
+            for team in fixture:
+                degree[team] = degree.get(team, 0) + 1
+        room = sum(threshold - points[team] for team in degree)
+        gains = sorted((least * count - (threshold - points[team]) for team, count in degree.items()), reverse=True)
+        return least * len(remaining) - room <= sum(gain for gain in gains[:max(spare, 0)] if gain > 0)
+
+    def required(self, team, places):
+        """
+        Find the results a team needs to keep its chance of finishing in one of the top places.
+
+        Returns
+        -------
+        dict
+           For each fixture in which some results would end the team's
+           chances, keyed by the fixture's label, the outcomes which
+           would not. An empty dictionary means that no single result
+           can eliminate the team, or that it is already eliminated.
+        """
+        if not self.can_finish(team, places):
+            return {}
+        target = self._index(team)
+        needed = {}
+        for number, (label, (home, away)) in enumerate(zip(self.labels, self.fixtures)):
+            # A result is at least as good for the team as any which
+            # gives it no more points and its rivals no fewer, so most
+            # results can be decided from those already tried
+            sign = (-1 if home == target else 1, -1 if away == target else 1)
+            worse = lambda a, b: all(sign[i] * a[i] >= sign[i] * b[i] for i in range(2))
+            possible = {}
+            for outcome in sorted(self.outcomes, key=lambda result: -(sign[0] * result[0] + sign[1] * result[1])):
+                if outcome in possible:
+                    continue
+                found = self.can_finish(team, places, {number: outcome})
+                for other in self.outcomes:
+                    if found and worse(outcome, other) or not found and worse(other, outcome):
+                        possible.setdefault(other, found)
+            if not all(possible.values()):
+                needed[label] = [description for outcome, description in self.outcomes.items() if possible[outcome]]
+        return needed
+
+    def report(self, team, places):
+        """
+        Summarise a team's chances of finishing in one of the top places.
+
+        Returns
+        -------
+        dict
+           Whether the team has clinched a place, whether it has been
+           eliminated, and the results it needs, as from ``required``.
+        """
+        eliminated = self.eliminated(team, places)
+        return {"clinched": not eliminated and self.clinched(team, places),
+                "eliminated": eliminated,
+                "required": {} if eliminated else self.required(team, places)}
@@ -1,54 +1,172 @@
 import pandas as pd
 import numpy as np
 
+from . import intervals
+
 
 class Scores(object):
-    
+    """
+    The scoring events for one team in a match.
+
+    The events are held as arrays, sorted by minute. A DataFrame of the
+    events, with the running total, is only built when the ``scores``
+    attribute is first used.
+    """
+
+    __slots__ = ("type", "player", "value", "minute", "cumulative", "total", "_index", "_labels", "_columns", "_scores")
+
     def __init__(self, data):
-        self.scores = pd.DataFrame.from_dict(data)
-        try:
-            self.scores.sort_values('minute', inplace=True)
-            self.scores['cumulative'] = self.scores.value.cumsum() 
-        
-            self.total = self.scores['cumulative'].iloc[-1]
-        except:
-            self.total = 0
+        if isinstance(data, pd.DataFrame):
+            columns = {column: list(data[column]) for column in data.columns}
+            self._labels = data.index.values
+        else:
+            self._labels = None
+            columns = {}
+            for i, event in enumerate(data):
+                for key in event.keys():
+                    if key not in columns:
+                        columns[key] = [np.nan] * i
+                for key in columns:
+                    columns[key].append(event.get(key, np.nan))
+        columns.pop("cumulative", None)
+        self._set_columns(columns)
+
+    @classmethod
+    def from_columns(cls, columns, labels=None):
+        """
+        Build a set of scores from lists of the type, player, value and minute of each event.
+        """
+        scores = cls.__new__(cls)
+        scores._labels = None if labels is None else np.asarray(labels)
+        scores._set_columns(dict(columns))
+        return scores
+
+    def _set_columns(self, columns):
+        """Sort the events by minute and total them."""
+        self._columns = {name: self._array(values) for name, values in columns.items()}
+        self._scores = None
+
+        length = len(next(iter(self._columns.values()), []))
+        self._index = np.arange(length)
+        if "minute" in self._columns:
+            # Sort by minute, with any events missing a minute at the end
+            minute = self._columns["minute"]
+            missing = pd.isna(minute)
+            self._index = np.concatenate([self._index[~missing][np.argsort(minute[~missing], kind="quicksort")],
+                                          self._index[missing]])
+
+        self.type = self._column("type")
+        self.player = self._column("player")
+        self.value = self._column("value")
+        self.minute = self._column("minute")
+
+        self.cumulative = None
+        self.total = 0
+        if "minute" in self._columns and "value" in self._columns:
+            if self.value.dtype.kind == "f":
+                self.cumulative = np.where(np.isnan(self.value), np.nan, np.nancumsum(self.value))
+            else:
+                self.cumulative = np.cumsum(self.value)
+            if length > 0:
+                self.total = self.cumulative[-1]
+
+    @staticmethod
+    def _array(values):
+        """Convert a list of values to an array, with missing numbers as NaN."""
+        array = np.array(values)
+        if array.dtype.kind == "U":
+            return np.array(values, dtype=object)
+        if array.dtype == object:
+            return pd.Series(values).values
+        return array
+
+    def _column(self, name):
+        """Return one of the columns of the events, sorted by minute."""
+        if name not in self._columns:
+            return np.zeros(0, dtype=object if name in ("type", "player") else float)
+        return self._columns[name][self._index]
+
+    def columns(self):
+        """Return the columns of the ``scores`` DataFrame as arrays, sorted by minute."""
+        columns = {name: getattr(self, name) if name in ("type", "player", "value", "minute") else self._column(name)
+                   for name in self._columns}
+        if self.cumulative is not None:
+            columns["cumulative"] = self.cumulative
+        return columns
+
+    @property
+    def scores(self):
+        """The scoring events as a DataFrame."""
+        if self._scores is None:
+            if len(self._columns) == 0:
+                self._scores = pd.DataFrame()
+            else:
+                index = self._index if self._labels is None else self._labels[self._index]
+                self._scores = pd.DataFrame(self.columns(), index=index)
+        return self._scores
+
+    def __len__(self):
+        return len(self._index)
+
+    def _in_times(self, time_range):
+        """Find which events happened inside any of a list of time ranges, in minute order."""
+        return intervals.contains(*intervals.to_arrays(time_range), self.minute)
 
     def in_times(self, time_range):
-        on_field = []
-        for i, score in self.scores.iterrows():
-            for trange in time_range:
-                on_field.append(trange[0] <= score.minute <= trange[1])
-        return self.scores[on_field]
-    
-            
+        """
+        Return the events which happened inside any of a list of time ranges.
+
+        Parameters
+        ----------
+        time_range : list
+           The ``[start, end]`` ranges, which include their end points.
+        """
+        return self.scores[self._in_times(time_range)]
+
+    def points_in_times(self, time_range):
+        """Total the points scored inside any of a list of time ranges."""
+        return np.nansum(self.value[self._in_times(time_range)])
+
+    def points_in_times_each(self, time_ranges):
+        """
+        Total the points scored inside the time ranges of each of several players.
+
+        Parameters
+        ----------
+        time_ranges : list
+           The list of time ranges of each player, as in ``Lineup.time_ranges``.
+
+        Returns
+        -------
+        numpy.ndarray
+           The points for each player.
+        """
+        inside = intervals.contains_each(*intervals.pack(time_ranges), self.minute)
+        return inside @ np.nan_to_num(self.value.astype(float))
+
+
     def count(self, score_type="try"):
         """Count the number of a given type of scoring event."""
-        df = self.scores
-        try:
-            return df[df['type']==score_type].count()['value']
-        except KeyError:
-            return 0
-            
+        return np.count_nonzero((self.type == score_type) & pd.notna(self.value))
+
     def to_dict(self):
         """Represent scores as a dictionary."""
-        data = []
-        for i, row in self.scores[['player', 'type', 'value', 'minute']].iterrows():
-            data.append(row.to_dict())
-        return data
+        return [{"player": player, "type": score_type, "value": value, "minute": minute}
+                for player, score_type, value, minute
+                in zip(self.player.tolist(), self.type.tolist(), self.value.tolist(), self.minute.tolist())]
 
     def __repr__(self):
         out = []
-        for key, value in self.scores.iterrows():
-            out.append("{b[player]}\t{b[type]}".format(b=value))
+        for player, score_type in zip(self.player, self.type):
+            out.append("{}\t{}".format(player, score_type))
         return ("\n").join(out) #, "\n")
-    
+
     @property
     def html(self):
         out = []
         for key, value in self.scores.iterrows():
             out.append("<tr><td>{b[minute]}</td><td>{b[player]}</td><td>{b[type]}</td><td>{b[cumulative]}</td></tr>".format(a=key, b=value))
         return "<table>" + ("\n").join(out) + "</table>" #, "\n")
-    
+
     def _repr_html_(self):
         return self.html
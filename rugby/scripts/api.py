@@ -168,7 +168,7 @@ def seasons():
         out = []
 
         for season in seasons:
-            tournament = rugby.models.Tournament.get(season.tournament)
+            tournament = season.tournament
             out.append({"name": season.name,
                         "url": url_for("season", tournament=tournament.name.replace(" ", "_"), season=season.name,  _external=False),
                         "tournament": tournament.name})
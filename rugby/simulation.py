@@ -0,0 +1,206 @@
+"""
+Simulate the remainder of a season.
+
+A ``SeasonSimulation`` plays out a tournament's remaining fixtures many
+times over, starting from the current league table, and counts how
+often each team finishes in each position.
+
+Each team's tries are drawn from a Poisson distribution whose rate
+depends on the team's attack, its opponent's defence, and whether it
+is playing at home; each try is converted with the league's conversion
+rate, and penalties and drop goals are drawn from a second Poisson
+distribution. The strengths are estimated from the completed matches,
+shrunk towards the league average so that teams with few results are
+not given extreme ratings.
+
+Seasons are simulated in batches, as arrays with a row for each season
+and a column for each fixture, and scored with ``Rules.match_points``,
+so no matches or tables are built along the way. Each batch has its own
+random seed drawn from a single ``numpy.random.SeedSequence``, so a run
+with a given seed gives the same result however many processes it is
+spread over.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+def _simulate_batch(simulation, seed, size):
+    """Count the finishing positions in a batch of simulated seasons."""
+    return simulation.position_counts(simulation.positions(np.random.default_rng(seed), size))
+
+
+class SeasonSimulation():
+    """
+    A model of the remaining fixtures in a tournament.
+
+    Parameters
+    ----------
+    tournament : rugby.tournament.Tournament
+       The tournament to simulate.
+    rules : rugby.rules.Rules, optional
+       The rules used to award league points. Defaults to the tournament's rules.
+    prior : float, optional
+       The number of matches of league-average form which each team's
+       attack and defence are shrunk towards.
+    """
+
+    def __init__(self, tournament, rules=None, prior=2):
+        self.rules = rules if rules else tournament.rules
+        table = tournament.league_table(self.rules)
+        self.teams = [str(team) for team in table['team']]
+        self.points = table['points'].values.astype(float)
+        self.difference = table['diff'].values.astype(float)
+        number = {team: i for i, team in enumerate(self.teams)}
+
+        # As in the league table, teams level on points and difference
+        # are left in order of conference, and then in their original order
+        teams = [str(team) for team in tournament.teams()]
+        conferences = sorted(range(len(teams)), key=lambda i: tournament.team_conferences.get(teams[i], "A"))
+        self.tiebreak = np.empty(len(teams), dtype=int)
+        self.tiebreak[[number[teams[i]] for i in conferences]] = np.arange(len(teams))
+
+        fixtures = [(str(match.teams['home']), str(match.teams['away'])) for match in tournament.future]
+        for home, away in fixtures:
+            for team in (home, away):
+                if team not in number:
+                    raise ValueError(f"{team} has fixtures but is not in the league table")
+        self.home = np.array([number[home] for home, away in fixtures], dtype=int)
+        self.away = np.array([number[away] for home, away in fixtures], dtype=int)
+        # The fixtures each team plays at home and away, to total the results of each season at once
+        self.home_fixtures = np.zeros((len(fixtures), len(self.teams)))
+        self.home_fixtures[np.arange(len(fixtures)), self.home] = 1
+        self.away_fixtures = np.zeros((len(fixtures), len(self.teams)))
+        self.away_fixtures[np.arange(len(fixtures)), self.away] = 1
+
+        self._fit(tournament, number, prior)
+
+    def _fit(self, tournament, number, prior):
+        """Estimate the scoring rates for each fixture from the completed matches."""
+        results = tournament.results_table()
+        home = np.array([number[team] for team in results['home']], dtype=int)
+        away = np.array([number[team] for team in results['away']], dtype=int)
+        scores = results[['home_score', 'away_score']].values.astype(float)
+        tries = results[['home tries', 'away tries']].values.astype(float)
+        # Matches without scoring events count as converted tries
+        tries = np.where(np.isnan(tries), np.round(scores / 7), tries)
+
+        summary = tournament.score_summary() if len(results) else pd.DataFrame({"type": []})
+        counts = summary['type'].value_counts()
+        attempts = counts.get("try", 0)
+        self.conversion = counts.get("conversion", 0) / attempts if attempts else 0.7
+
+        teams = len(self.teams)
+        if len(results):
+            rates = tries.mean(axis=0)
+            kicks = np.maximum((scores - (5 + 2 * self.conversion) * tries).mean(axis=0) / 3, 0)
+        else:
+            rates, kicks = np.ones(2), np.zeros(2)
+        average = rates.mean()
+        scored = np.bincount(home, tries[:, 0], teams) + np.bincount(away, tries[:, 1], teams)
+        conceded = np.bincount(home, tries[:, 1], teams) + np.bincount(away, tries[:, 0], teams)
+        expected_for = np.bincount(home, np.full(len(home), rates[0]), teams) \
+            + np.bincount(away, np.full(len(away), rates[1]), teams)
+        expected_against = np.bincount(home, np.full(len(home), rates[1]), teams) \
+            + np.bincount(away, np.full(len(away), rates[0]), teams)
+        attack = (scored + prior * average) / (expected_for + prior * average)
+        defence = (conceded + prior * average) / (expected_against + prior * average)
+
+        self.try_rates = np.stack([rates[0] * attack[self.home] * defence[self.away],
+                                   rates[1] * attack[self.away] * defence[self.home]])
+        self.kick_rates = kicks
+
+    def sample(self, rng, size):
+        """
+        Draw the scores and tries of every fixture in a batch of seasons.
+
+        Returns
+        -------
+        scores, tries : numpy.ndarray
+           Arrays of shape (2, size, fixtures), with the home side first.
+        """
+        shape = (2, size, len(self.home))
+        tries = rng.poisson(self.try_rates[:, None, :], shape)
+        conversions = rng.binomial(tries, self.conversion)
+        kicks = rng.poisson(self.kick_rates[:, None, None], shape)
+        return 5 * tries + 2 * conversions + 3 * kicks, tries
+
+    def positions(self, rng, size):
+        """
+        Simulate a batch of seasons and find each team's finishing position.
+
+        Returns
+        -------
+        numpy.ndarray
+           An array with a row for each season and a column for each
+           team, giving its position in the final table, counting from 0.
+        """
+        scores, tries = self.sample(rng, size)
+        home = self.rules.match_points(scores[0], scores[1], tries[0])['points']
+        away = self.rules.match_points(scores[1], scores[0], tries[1])['points']
+        margin = scores[0] - scores[1]
+        points = self.points + home @ self.home_fixtures + away @ self.away_fixtures
+        difference = self.difference + margin @ self.home_fixtures - margin @ self.away_fixtures
+
+        teams = len(self.teams)
+        order = np.lexsort((np.broadcast_to(self.tiebreak, points.shape), -difference, -points), axis=-1)
+        positions = np.empty_like(order)
+        np.put_along_axis(positions, order, np.arange(teams)[None, :], axis=-1)
+        return positions
+
+    def position_counts(self, positions):
+        """Count how often each team finished in each position."""
+        teams = len(self.teams)
+        return np.bincount((np.arange(teams)[None, :] * teams + positions).ravel(),
+                           minlength=teams * teams).reshape(teams, teams)
+
+    def run(self, seasons=10000, batch=1000, seed=None, processes=1):
+        """
+        Simulate many seasons.
+
+        Parameters
+        ----------
+        seasons : int, optional
+           The number of seasons to simulate.
+        batch : int, optional
+           The number of seasons simulated together in one set of arrays.
+        seed : int, optional
+           The random seed. The same seed and batch size always give the
+           same result, whatever the number of processes.
+        processes : int, optional
+           The number of processes to simulate batches in. None uses the
+           number of CPUs; 1 simulates them in this process.
+
+        Returns
+        -------
+        pandas.DataFrame
+           The probability of each team finishing in each position, with
+           a row for each team in the current table order and a column
+           for each position, counting from 1.
+        """
+        sizes = [batch] * (seasons // batch) + ([seasons % batch] if seasons % batch else [])
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        if processes == 1 or len(sizes) < 2:
+            counts = [_simulate_batch(self, child, size) for child, size in zip(seeds, sizes)]
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                counts = list(executor.map(_simulate_batch, [self] * len(sizes), seeds, sizes))
+        total = np.sum(counts, axis=0) if counts else np.zeros((len(self.teams), len(self.teams)))
+        return pd.DataFrame(total / max(seasons, 1), index=pd.Index(self.teams, name="team"),
+                            columns=np.arange(1, len(self.teams) + 1))
+
+
+def top_places(distribution, places):
+    """
+    Find the probability of each team finishing in one of the top places, for example a playoff place.
+
+    Parameters
+    ----------
+    distribution : pandas.DataFrame
+       The output of ``SeasonSimulation.run``.
+    places : int
+       The number of places.
+    """
+    return distribution[distribution.columns[:places]].sum(axis=1)
@@ -0,0 +1,352 @@
+"""
+A columnar representation of a tournament.
+
+A ``Tournament`` holds its matches as a list of ``Match`` objects, each
+with its own small lineup and score DataFrames. A ``MatchStore`` holds
+the same information as three flat tables: one row for each match, one
+for each appearance by a player, and one for each scoring event. Teams,
+players and scoring types are stored as categorical codes, and the rows
+of the appearance and event tables are sorted by match, so the rows for
+any one match are a contiguous slice.
+
+The lineup and scoring columns are kept as they appear in the source
+data, so the summary tables of a ``Tournament`` can be built from the
+store as slices, lookups and a merge, rather than by walking every
+match; a tournament does this when its ``columnar`` option is set.
+"""
+
+import numpy as np
+import pandas as pd
+
+from . import utils
+from .team import Team
+
+
+SIDES = pd.CategoricalDtype(["home", "away"])
+
+
+class MatchStore():
+    """
+    The matches, appearances and scoring events of a tournament in columnar form.
+
+    Parameters
+    ----------
+    matches : pandas.DataFrame
+       One row for each match, with the date, round, teams, scores and
+       try counts, whether the match is still to be played, and whether
+       it has lineups and scoring events.
+    appearances : pandas.DataFrame
+       One row for each player named in a lineup, with the match, side,
+       team and shirt number, followed by the lineup's own columns (with
+       the name as ``player``) and the game time.
+    intervals : pandas.DataFrame
+       One row for each period a player spent on the field, with the
+       row of the appearance and the start and end minutes.
+    events : pandas.DataFrame
+       One row for each scoring event, with the match, side and team,
+       followed by the columns of the scores, including the player, type,
+       value, minute and running total.
+    teams : dict
+       The team objects, keyed by short name.
+    """
+
+    def __init__(self, matches, appearances, intervals, events, teams):
+        self.matches = matches
+        self.appearances = appearances
+        self.intervals = intervals
+        self.events = events
+        self.teams = teams
+        self._appearance_bounds = self._bounds(appearances['match'].values)
+        self._event_bounds = self._bounds(events['match'].values)
+
+    def _bounds(self, column):
+        """Find the first and last row for each match in a table sorted by match."""
+        order = np.arange(len(self.matches))
+        return np.searchsorted(column, order, side="left"), np.searchsorted(column, order, side="right")
+
+    @classmethod
+    def from_tournament(cls, tournament):
+        """
+        Build a store from the completed matches and fixtures of a tournament.
+        """
+        teams = {}
+        matches = []
+        appearances = {}
+        intervals = []
+        events = {}
+        lengths = {"appearances": 0, "events": 0}
+        played = [(match, False) for match in tournament.matches]
+        fixtures = [(match, True) for match in tournament.future]
+        for number, (match, future) in enumerate(played + fixtures):
+            names = {}
+            for state in ("home", "away"):
+                team = match.teams[state]
+                if not isinstance(team, Team):
+                    team = Team(team, {"primary": "#000000"}, team, None)
+                teams.setdefault(team.short_name, team)
+                names[state] = team.short_name
+            lineups = hasattr(match, "lineups")
+            scores = getattr(match, "scores", None)
+            tries = [np.nan, np.nan] if scores == None else [scores[state].count("try") for state in ("home", "away")]
+            matches.append([match.date, getattr(match, "round", np.nan), names['home'], names['away'],
+                            match.score['home'], match.score['away'], tries[0], tries[1], future,
+                            lineups, scores != None])
+
+            for state in ("home", "away"):
+                if lineups:
+                    lineup = match.lineups[state]
+                    size = len(lineup.names)
+                    for k, name in enumerate(lineup.names):
+                        for start, end in lineup.time_ranges.get(name, []):
+                            intervals.append([lengths["appearances"] + k, start, end])
+                    columns = {"player" if key == "name" else key: values for key, values in lineup._columns.items()}
+                    lengths["appearances"] = utils.append_columns(
+                        appearances, {"match": [number] * size, "side": [state] * size, "team": [names[state]] * size,
+                                      "position": lineup.numbers, **columns, "game time": lineup.game_time},
+                        lengths["appearances"], size)
+                if scores != None:
+                    side = scores[state]
+                    lengths["events"] = utils.append_columns(
+                        events, {"match": [number] * len(side), "side": [state] * len(side),
+                                 "team": [names[state]] * len(side), **side.columns()},
+                        lengths["events"], len(side))
+
+        team_codes = pd.CategoricalDtype(sorted(teams))
+        # Unnamed lineup places and unattributed scores, such as those in
+        # seasons loaded from CSV, have no player code
+        players = pd.CategoricalDtype(sorted({name for table in (appearances, events)
+                                              for name in table.get("player", []) if isinstance(name, str)}))
+
+        matches = pd.DataFrame(matches, columns=["date", "round", "home", "away", "home_score", "away_score",
+                                                 "home_tries", "away_tries", "future", "lineups", "scored"])
+        matches = matches.astype({"date": "datetime64[ns]", "round": float, "home": team_codes, "away": team_codes,
+                                  "home_score": float, "away_score": float,
+                                  "future": bool, "lineups": bool, "scored": bool})
+
+        appearances = pd.DataFrame(appearances, columns=list(appearances) or ["match", "side", "team", "position",
+                                                                              "player", "game time"])
+        appearances = appearances.astype({"match": np.int32, "side": SIDES, "team": team_codes,
+                                          "player": players, "position": np.int16})
+
+        intervals = pd.DataFrame(intervals, columns=["appearance", "start", "end"])
+        intervals = intervals.astype({"appearance": np.int32, "start": np.float32, "end": np.float32})
+
+        events = pd.DataFrame(events, columns=list(events) or ["match", "side", "team", "type", "player", "value",
+                                                               "minute", "cumulative"])
+        events = events.astype({"match": np.int32, "side": SIDES, "team": team_codes, "player": players,
+                                "type": "category"})
+
+        return cls(matches, appearances, intervals, events, teams)
+
+    def __len__(self):
+        return len(self.matches)
+
+    def __getitem__(self, number):
+        if not -len(self) <= number < len(self):
+            raise IndexError(number)
+        return MatchView(self, number % len(self))
+
+    def __iter__(self):
+        return (MatchView(self, number) for number in range(len(self)))
+
+    def memory_usage(self):
+        """Return the number of bytes used by the tables."""
+        return sum(int(table.memory_usage(deep=True).sum())
+                   for table in (self.matches, self.appearances, self.intervals, self.events))
+
+    def lineup(self, number, side=None):
+        """Return the appearances in a match, optionally for only one side."""
+        lower, upper = self._appearance_bounds[0][number], self._appearance_bounds[1][number]
+        rows = self.appearances.iloc[lower:upper]
+        if side:
+            rows = rows[rows['side'] == side]
+        return rows
+
+    def scores(self, number, side=None):
+        """Return the scoring events in a match, optionally for only one side."""
+        lower, upper = self._event_bounds[0][number], self._event_bounds[1][number]
+        rows = self.events.iloc[lower:upper]
+        if side:
+            rows = rows[rows['side'] == side]
+        return rows
+
+    #: The columns which the store adds to the lineup and scoring columns.
+    KEYS = ["match", "side", "team", "position"]
+
+    @staticmethod
+    def _plain(table):
+        """Turn categorical columns back into plain values, as in the tables built from ``Match`` objects."""
+        for column in table.columns:
+            if isinstance(table[column].dtype, pd.CategoricalDtype):
+                table[column] = table[column].astype(object)
+        return table
+
+    def _rows(self, table, column):
+        """Select the rows of a table which belong to completed matches with a flag set, such as ``scored``."""
+        chosen = (~self.matches['future'] & self.matches[column]).values
+        return table[chosen[table['match'].values]].reset_index(drop=True)
+
+    def _teams(self, table, rows):
+        """Add the home and away teams of each row's match, and the row's own team, at the end of a table."""
+        matches = self.matches.iloc[rows['match'].values]
+        table['home'] = matches['home'].astype(str).values
+        table['away'] = matches['away'].astype(str).values
+        table['team'] = rows['team'].astype(str).values
+        return table
+
+    def fixtures_table(self, future=False):
+        """
+        Produce a table of the dates and teams of the completed matches, or of the fixtures.
+        """
+        rows = self.matches[self.matches['future'] == future]
+        return pd.DataFrame(list(zip(rows['date'], rows['home'].astype(str), rows['away'].astype(str))),
+                            columns=["date", "home", "away"])
+
+    def results_table(self):
+        """
+        Produce a table of the results of the completed matches, in the same form as ``Tournament.results_table``.
+
+        Matches with scoring events come first, as they do there.
+        """
+        rows = self.matches[~self.matches['future']]
+        rows = rows.iloc[np.argsort(~rows['scored'].values, kind="stable")]
+        tries = rows[['home_tries', 'away_tries']]
+        # Try counts are only missing for matches without scoring events
+        if rows['scored'].all():
+            tries = tries.astype(np.int64)
+        return pd.DataFrame({"home": rows['home'].astype(str).values,
+                             "away": rows['away'].astype(str).values,
+                             "home_score": rows['home_score'].values,
+                             "away_score": rows['away_score'].values,
+                             "difference": (rows['home_score'] - rows['away_score']).values,
+                             "home tries": tries['home_tries'].values,
+                             "away tries": tries['away_tries'].values})
+
+    def lineup_summary(self):
+        """
+        Produce a table of every appearance in the completed matches, in the same form as ``Tournament.lineup_summary``.
+        """
+        rows = self._rows(self.appearances, "lineups")
+        order = rows.groupby("match").cumcount().values
+        fields = self._plain(rows.drop(columns=self.KEYS).rename(columns={"player": "name"}))
+        table = pd.concat([pd.DataFrame({"level_0": order, "index": rows['position'].values.astype(int)}), fields],
+                          axis=1)
+        table = self._teams(table, rows)
+        table['position'] = table['level_0']
+        return table
+
+    def score_summary(self, squad=False):
+        """
+        Produce a table of every scoring event in the completed matches, in the same form as ``Tournament.score_summary``.
+
+        Parameters
+        ----------
+        squad : bool, optional
+           Include every player in the lineups, whether or not they scored.
+        """
+        if squad:
+            return self._squad_summary()
+        rows = self._rows(self.events, "scored")
+        fields = self._plain(rows.drop(columns=self.KEYS[:3]).rename(columns={"player": "name"}))
+        table = pd.concat([pd.DataFrame({"index": rows.groupby("match").cumcount().values}), fields], axis=1)
+        return self._teams(table, rows)
+
+    def _squad_summary(self):
+        """
+        Join each player in the lineups of the scored matches to their scoring events.
+
+        Each player has a row for each of their events in the match, or
+        a single row without an event, and events which no player in the
+        lineups made follow at the end of the match. Players are matched
+        to events by their code, so an unnamed lineup place takes any
+        unattributed events, as it does when the table is built from
+        ``Match`` objects.
+        """
+        players = self._rows(self.appearances, "scored")
+        events = self._rows(self.events, "scored")
+        joined = pd.DataFrame({"match": players['match'].values, "key": players['player'].cat.codes.values,
+                               "appearance": np.arange(len(players))}) \
+            .merge(pd.DataFrame({"match": events['match'].values, "key": events['player'].cat.codes.values,
+                                 "event": np.arange(len(events))}), on=["match", "key"], how="left")
+        event = joined['event'].fillna(-1).astype(int).values
+        unused = np.setdiff1d(np.arange(len(events)), event)
+
+        lineup = self._plain(players.drop(columns=self.KEYS).rename(columns={"player": "name"}))
+        scoring = self._plain(events.drop(columns=self.KEYS[:3] + ["player"]))
+        made = pd.concat([lineup.iloc[joined['appearance'].values].reset_index(drop=True),
+                          scoring.reindex(event).reset_index(drop=True)], axis=1)
+        table = pd.concat([made, scoring.iloc[unused].reset_index(drop=True)], ignore_index=True)
+        rows = pd.concat([players.iloc[joined['appearance'].values], events.iloc[unused]], ignore_index=True)
+
+        # Each match's players in lineup order, then its unused events
+        part = np.concatenate([np.zeros(len(joined), dtype=int), np.ones(len(unused), dtype=int)])
+        within = np.concatenate([joined['appearance'].values, unused])
+        order = np.lexsort((event.tolist() + unused.tolist(), within, part, rows['match'].values))
+        table, rows = table.iloc[order].reset_index(drop=True), rows.iloc[order].reset_index(drop=True)
+        table.insert(0, "index", rows.groupby("match").cumcount().values)
+        return self._teams(table, rows)
+
+    def player_points(self):
+        """
+        Total the points scored by each player for each team.
+        """
+        return self.events.groupby(["team", "player"], observed=True)['value'].sum()
+
+    def player_time(self):
+        """
+        Total the minutes played by each player for each team.
+        """
+        return self.appearances.groupby(["team", "player"], observed=True)['game time'].sum()
+
+
+class MatchView():
+    """
+    A single match in a ``MatchStore``.
+
+    The view holds no data of its own; everything is read from the
+    store's tables when it is asked for.
+    """
+
+    __slots__ = ("store", "number")
+
+    def __init__(self, store, number):
+        self.store = store
+        self.number = number
+
+    @property
+    def _row(self):
+        return self.store.matches.iloc[self.number]
+
+    @property
+    def date(self):
+        return self._row['date']
+
+    @property
+    def round(self):
+        return self._row['round']
+
+    @property
+    def future(self):
+        return bool(self._row['future'])
+
+    @property
+    def teams(self):
+        row = self._row
+        return {"home": self.store.teams[row['home']], "away": self.store.teams[row['away']]}
+
+    @property
+    def score(self):
+        row = self._row
+        return {"home": row['home_score'], "away": row['away_score']}
+
+    def lineup(self, side=None):
+        """Return the players named in the lineup, optionally for only one side."""
+        return self.store.lineup(self.number, side)
+
+    def scores(self, side=None):
+        """Return the scoring events, optionally for only one side."""
+        return self.store.scores(self.number, side)
+
+    def __repr__(self):
+        row = self._row
+        return f"""{row['date']:%Y-%m-%d %H:%M} {row['home']} {row['home_score']:>3} v {row['away_score']:<3} {row['away']}"""
@@ -1,5 +1,4 @@
 from itertools import chain
-import pandas as pd
 
 from .player import Player
 
@@ -54,17 +53,7 @@ class Team():
         return self.name.__hash__()
     
     def matches(self, tournament, filts=None):
-        if filts=="home":
-            return [x for x in tournament.matches if (x.teams['home'] == self)]
-        elif filts=="away":
-            return [x for x in tournament.matches if (x.teams['away'] == self)]
-        else:
-            return [x for x in tournament.matches if (x.teams['home'] == self) or (x.teams['away'] == self)]
+        return tournament.team_matches(self, filts)
         
     def squad(self, tournament):
-        positions = []
-        positions += [x.lineups['away'].lineup for x in self.matches(tournament, filts="away")]
-        positions += [x.lineups['home'].lineup for x in self.matches(tournament, filts="home")]
-        positions = pd.concat(positions)
-        players = [Player(player['name']) for i, player in positions['name'].reset_index().drop_duplicates().iterrows()]
-        return players
+        return [Player(name) for name in tournament.squad(self)]
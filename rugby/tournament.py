@@ -4,22 +4,54 @@ from itertools import chain
 import pandas as pd
 import numpy as np
 
+import csv
 import json
 
 from . import models
 from .match import Match, Lineup
+from .scores import Scores
 from .team import Team
 from . import utils
+from .covariance import mutual_rates
+from .rules import Rules
+from .store import MatchStore
+from .simulation import SeasonSimulation
+from .scenarios import Scenarios
+from .ratings import Ratings
+from . import cache as tournament_cache
+
 
 class Tournament():
     """
     Represent a whole tournament.
+
+    Parameters
+    ----------
+    name : str
+       The name of the tournament.
+    season : str
+       The season.
+    matches : list or pandas.DataFrame
+       The data for each match.
+    teams : dict, optional
+       The teams in each conference.
+    rules : rugby.rules.Rules, optional
+       The rules used to award league points, including any points deductions.
+    lazy : bool, optional
+       Only build the lineups and scores of each match when they are
+       first used. Defaults to False.
+    columnar : bool, optional
+       Build the results, fixtures, lineup and score tables from the
+       columnar ``store`` rather than from each match in turn. Defaults
+       to False.
     """
     
-    def __init__(self, name, season, matches, teams=None):
+    def __init__(self, name, season, matches, teams=None, rules=None, lazy=False, columnar=False):
         
         self.season=season
+        self.columnar = columnar
         self.name = name
+        self.rules = rules if rules else Rules()
         
         self.team_conferences = {}
         if teams: 
@@ -34,59 +66,109 @@ class Tournament():
             self.team_conferences = cons
             
         if isinstance(matches, pd.DataFrame):
-            self.matches = [Match(x, tournament=self) for i, x in matches.iterrows()]
+            matches = [Match(x, tournament=self, lazy=lazy) for i, x in matches.iterrows()]
         else:
-            self.matches = [Match(x, tournament=self) for x in matches]
-            
-        self.future = [match for match in self.matches if (match.score==None) or (pd.isna(match.score['home']))]
-        
-        for match in self.future:
-            self.matches.remove(match)
+            matches = [Match(x, tournament=self, lazy=lazy) for x in matches]
+
+        self.matches = []
+        self.future = []
+        for match in matches:
+            if (match.score==None) or (pd.isna(match.score['home'])):
+                self.future.append(match)
+            else:
+                self.matches.append(match)
+
+        self._build_index()
+        self.standings = None
+        self._ratings = None
+        self._store = None
+        self._tables = {}
         
     @classmethod
-    def from_json(cls, file):
+    def from_json(cls, file, lazy=False, cache=None, columnar=False):
         """
         Generate a Tournament from a JSON file.
 
         file : path
            The path of a JSON file containing the saved tournament data.
+        lazy : bool, optional
+           Keep the raw record of each match, and only build its lineups
+           and scores when they are first used. The date, teams and score
+           of every match are still available straight away. Lazy
+           loading does not use the cache.
+        cache : rugby.cache.TournamentCache or bool, optional
+           The cache of parsed tournaments to use. By default the cache
+           given by the ``RUGBY_CACHE`` environment variable is used, if
+           it is set; False disables the cache.
+        columnar : bool, optional
+           Build the summary tables from the columnar ``store``.
         """
+        cache = None if lazy else tournament_cache.resolve(cache)
+        if cache:
+            key = cache.key(file, "json")
+            tournament = cache.load(key, cls)
+            if tournament is None:
+                tournament = cls.from_json(file, cache=False)
+                cache.save(key, tournament)
+            tournament.columnar = columnar
+            return tournament
 
         with open(file, "r") as f:
             data =json.load(f)
 
-        matches = pd.DataFrame.from_dict(data['matches'])
+        if lazy:
+            matches = data['matches']
+        else:
+            matches = pd.DataFrame.from_dict(data['matches'])
         if "teams" in data.keys():
             teams = data['teams']
         else:
             teams = None
             
-        return cls(data['name'], data['season'], matches, teams)
+        return cls(data['name'], data['season'], matches, teams, lazy=lazy, columnar=columnar)
 
     @classmethod
-    def from_csv(cls, file, name, season):
+    def from_csv(cls, file, name, season, cache=None, columnar=False):
         """
         Generate a Tournament from a CSV file.
+
+        cache : rugby.cache.TournamentCache or bool, optional
+           The cache of parsed tournaments to use, as for ``from_json``.
+        columnar : bool, optional
+           Build the summary tables from the columnar ``store``.
         """
+        cache = tournament_cache.resolve(cache)
+        if cache:
+            key = cache.key(file, "csv", name, season)
+            tournament = cache.load(key, cls)
+            if tournament is None:
+                tournament = cls.from_csv(file, name, season, cache=False)
+                cache.save(key, tournament)
+            tournament.columnar = columnar
+            return tournament
+
         data = pd.read_csv(file)
         matches = utils.dense_table_to_nested(data)
 
-        return cls(name, season, matches)
+        return cls(name, season, matches, columnar=columnar)
 
-    def to_database(self):
+    def to_database(self, session=None):
         """
         Save this tournament to the database.
-        """
-        season = models.Season.add(self)
-        
-        for team in self.teams():
-            models.Team.add(team)
 
-        for match in self.matches:
-            models.Match.add(match)
+        The teams, matches, lineups and scoring events are all written
+        in a single transaction, and anything which is already in the
+        database is left unchanged, so a tournament can safely be
+        imported more than once.
 
-        for match in self.future:
-            models.Match.add(match)
+        Parameters
+        ----------
+        session : sqlalchemy.orm.Session, optional
+           The database session to use. Defaults to the application's session.
+        """
+        if session is None:
+            return models.ingest(self)
+        return models.ingest(self, session=session)
     
     def to_json(self, filename=None):
         """Serialise this tournament as a json."""
@@ -107,33 +189,31 @@ class Tournament():
     def save_csv(self, file):
         """
         Save this tournament as a CSV.
+
+        The rows for each match are written as soon as they are made,
+        so the whole table is never held in memory. Matches with no
+        round are numbered in order, so that every match can be read
+        back with ``from_csv``.
+
+        Parameters
+        ----------
+        file : path or file-like
+           The file to write to.
         """
-        rows = []
-        for match in tournament.matches:
-            for state in ("home", "away"):
-                if not hasattr(match, 'lineups'):
-                    rows.append([int(match.round), match.date, np.nan, np.nan, match.teams['home'], match.teams['away']])
-                else:
-                    match.lineups[state].lineup['position'] = match.lineups[state].lineup.index
-                    match.scores[state].scores['ix'] = match.scores[state].scores.index
-                    mega = pd.merge(
-                    match.scores[state].scores.join(match.scores[state].scores.pivot(columns="type", values=["minute"], index=("ix"))), 
-                    match.lineups[state].lineup, left_on='player', right_on='name', how='outer')
-                    mega = mega.sort_values("position")
-                    mega = mega.rename(columns={("minute", "conversion"): "conversion",
-                                           ("minute", "penalty"): "penalty",
-                                           ("minute", "try"): "tries",
-                                            ("minute", "kick"): "kick"
-                                           })
-                    for column in ['kick', 'tries', 'penalty', 'conversion']:
-                        if not column in mega.columns:
-                            mega[column] = pd.Series()
-
-                    for i, player in mega.fillna("").iterrows():
-                        rows.append([int(match.round), match.date, match.scores['home'].total, match.scores['away'].total, match.teams['home'], match.teams['away'], match.teams[state],\
-                             player.name, i, player.on, player.off, player.yellows, player.reds, player.tries, player.conversion, player.kick, player.penalty])
-        pd.DataFrame(rows, columns = ["round", "date", "home_score", "away_score", "home", "away", "team", "player", "position", "on", "off", "yellow", "red", "try", "conversion", "kick", "penalty"]).to_csv(file)
+        if isinstance(file, str):
+            with open(file, "w", newline="") as f:
+                return self.save_csv(f)
 
+        writer = csv.writer(file)
+        writer.writerow([""] + utils.DENSE_COLUMNS)
+        number = 0
+        for k, match in enumerate(self.matches + self.future):
+            tround = getattr(match, "round", None)
+            if tround is None or pd.isna(tround):
+                tround = k + 1
+            for row in utils.match_to_dense_rows(match, int(tround)):
+                writer.writerow([number] + row)
+                number += 1
 
     def _add_match(self, match):
         """
@@ -147,14 +227,197 @@ class Tournament():
         match.season = self.season
         
         # Check if this match already exists in the tournament
-        matches = [matchi for matchi in self.matches if ((matchi.teams['home']==home) & (matchi.teams['away']==away) & (matchi.date==date))]
-        for matchi in matches:
+        for matchi in self._index["matches"].pop((home, away, date), []):
             self.matches.remove(matchi)
-        matches = [matchi for matchi in self.future if ((matchi.teams['home']==home) & (matchi.teams['away']==away) & (matchi.date==date))]
-        for matchi in matches:
+            self._unindex_match(matchi)
+            if self.standings is not None:
+                self._update_standings(matchi, -1)
+            if self._ratings is not None:
+                self._ratings.remove(matchi)
+        for matchi in self._index["future"].pop((home, away, date), []):
             self.future.remove(matchi)
+            self._unindex_match(matchi, future=True)
         self.matches.append(match)
+        self._index_match(match)
+        if self.standings is not None:
+            self._update_standings(match, +1)
+        if self._ratings is not None:
+            self._ratings.add(match)
+        self._store = None
+        self._tables = {}
         return self
+
+    def _build_index(self):
+        """
+        Index the matches and fixtures by their teams and date, by team, and by round.
+
+        The player and squad indexes need the lineups of every match, so
+        they are only built when they are first used.
+        """
+        self._index = {"matches": {}, "future": {}}
+        self._team_index = {}
+        self._round_index = {"matches": {}, "future": {}}
+        self._player_index = None
+        for match in self.matches:
+            self._index_match(match)
+        for match in self.future:
+            self._index_match(match, future=True)
+
+    def _index_match(self, match, future=False):
+        """Add a match to the indexes."""
+        which = "future" if future else "matches"
+        home, away = match.teams['home'], match.teams['away']
+        self._index[which].setdefault((home, away, match.date), []).append(match)
+        self._round_index[which].setdefault(getattr(match, "round", None), []).append(match)
+        if not future:
+            for state, team in (("home", home), ("away", away)):
+                teams = self._team_index.setdefault(team, {"home": [], "away": [], "all": []})
+                teams[state].append(match)
+                teams["all"].append(match)
+            if self._player_index is not None:
+                self._index_players(match, +1)
+
+    def _unindex_match(self, match, future=False):
+        """Remove a match from the indexes, other than the one for its teams and date."""
+        which = "future" if future else "matches"
+        self._round_index[which][getattr(match, "round", None)].remove(match)
+        if not future:
+            for state in ("home", "away"):
+                teams = self._team_index[match.teams[state]]
+                teams[state].remove(match)
+                teams["all"].remove(match)
+            if self._player_index is not None:
+                self._index_players(match, -1)
+
+    def _build_player_index(self):
+        """
+        Index the appearances and scoring events of each player, and the players in each team's squad.
+        """
+        self._player_index = {"appearances": {}, "scores": {}, "squads": {}}
+        for match in self.matches:
+            self._index_players(match, +1)
+
+    def _index_players(self, match, sign):
+        """Add the players in a match to the player indexes, or remove them if ``sign`` is negative."""
+        appearances, scores, squads = (self._player_index[key] for key in ("appearances", "scores", "squads"))
+        for state in ("home", "away"):
+            if hasattr(match, "lineups"):
+                squad = squads.setdefault(match.teams[state], {})
+                for row, name in enumerate(match.lineups[state].names):
+                    if not isinstance(name, str):
+                        continue
+                    if sign > 0:
+                        appearances.setdefault(name, []).append((match, state, row))
+                        squad[name] = squad.get(name, 0) + 1
+                    else:
+                        appearances[name] = [entry for entry in appearances[name] if entry[0] is not match]
+                        squad[name] -= 1
+                        if squad[name] == 0:
+                            del squad[name]
+            if getattr(match, "scores", None) != None:
+                for event, name in enumerate(match.scores[state].player):
+                    if not isinstance(name, str):
+                        continue
+                    if sign > 0:
+                        scores.setdefault(name, []).append((match, state, event))
+                    else:
+                        scores[name] = [entry for entry in scores[name] if entry[0] is not match]
+
+    def _players(self, index):
+        if self._player_index is None:
+            self._build_player_index()
+        return self._player_index[index]
+
+    def find_match(self, home, away, date, future=False):
+        """
+        Find the matches between two teams on a given date.
+
+        Parameters
+        ----------
+        home, away : rugby.team.Team or str
+           The home and away teams.
+        date : datetime
+           The date of the match.
+        future : bool
+           Search the fixtures rather than the completed matches.
+        """
+        return list(self._index["future" if future else "matches"].get((home, away, pd.to_datetime(date)), []))
+
+    def team_matches(self, team, filts=None):
+        """
+        Return the completed matches played by a team.
+
+        Parameters
+        ----------
+        team : rugby.team.Team or str
+           The team.
+        filts : {"home", "away"}, optional
+           Only return the team's home or away matches.
+        """
+        teams = self._team_index.get(team)
+        if teams is None:
+            return []
+        return list(teams[filts if filts in ("home", "away") else "all"])
+
+    def round_matches(self, tround, future=False):
+        """
+        Return the matches in a given round.
+
+        Parameters
+        ----------
+        tround : int
+           The round.
+        future : bool
+           Return the fixtures in the round rather than the completed matches.
+        """
+        return list(self._round_index["future" if future else "matches"].get(tround, []))
+
+    def player_matches(self, player):
+        """
+        Return the completed matches in which a player was named in a lineup.
+
+        Parameters
+        ----------
+        player : rugby.player.Player or str
+           The player, or their name.
+        """
+        matches = []
+        for match, state, row in self._players("appearances").get(getattr(player, "name", player), []):
+            if not matches or matches[-1] is not match:
+                matches.append(match)
+        return matches
+
+    def player_scores(self, player):
+        """
+        Return every scoring event by a player in the completed matches.
+
+        Parameters
+        ----------
+        player : rugby.player.Player or str
+           The player, or their name.
+
+        Returns
+        -------
+        rugby.scores.Scores
+           The events, with the minute each was scored in its match.
+        """
+        columns = {"type": [], "player": [], "value": [], "minute": []}
+        for match, state, event in self._players("scores").get(getattr(player, "name", player), []):
+            scores = match.scores[state]
+            for name in columns:
+                columns[name].append(getattr(scores, name)[event])
+        return Scores.from_columns(columns)
+
+    def squad(self, team):
+        """
+        Return the names of every player named in a team's lineups, in the order they first appeared.
+
+        Parameters
+        ----------
+        team : rugby.team.Team or str
+           The team.
+        """
+        return list(self._players("squads").get(team, {}))
             
     def teams(self):
         """
@@ -170,17 +433,49 @@ class Tournament():
         else:
             return self.team_list
 
+    @property
+    def store(self):
+        """
+        The matches in this tournament as a columnar ``MatchStore``.
+
+        The store is built the first time it is needed, and rebuilt
+        after a match is added.
+        """
+        if self._store is None:
+            self._store = MatchStore.from_tournament(self)
+        return self._store
+
+    def _table(self, key, build):
+        """
+        Return a copy of a derived table, building it if this is the first time it is needed.
+
+        The tables are kept until a match is added to the tournament.
+        """
+        if key not in self._tables:
+            self._tables[key] = build()
+        return self._tables[key].copy()
+
     def positions(self):
         """
         Provide a list of all of the positions played.
         """
-        positions = pd.DataFrame([])
-        positions = positions.append([x.lineups['home'].lineup for x in self.matches], ignore_index=True)
-        positions = positions.append( [x.lineups['away'].lineup for x in self.matches], ignore_index=True)
-        #positions = chain(*positions)
-        return positions #list(positions)
+        return self._table("positions", self._build_positions)
+
+    def _build_positions(self):
+        columns = {}
+        length = 0
+        for state in ("home", "away"):
+            for match in self.matches:
+                if not hasattr(match, "lineups"):
+                    continue
+                lineup = match.lineups[state]
+                length = utils.append_columns(columns, {**lineup._columns, "game time": lineup.game_time},
+                                         length, len(lineup.names))
+        return pd.DataFrame(columns)
 
     def fixtures_table(self, future=False):
+        if self.columnar:
+            return self.store.fixtures_table(future)
         if not future:
             data = [[pd.to_datetime(match.date), match.teams['home'].short_name, match.teams['away'].short_name] for match in self.matches]
         else:
@@ -188,6 +483,11 @@ class Tournament():
         return pd.DataFrame(data, columns=["date", "home", "away"])
     
     def results_table(self):
+        if self.columnar:
+            return self._table("results", lambda: self.store.results_table())
+        return self._table("results", self._build_results_table)
+
+    def _build_results_table(self):
         scores = [[match.teams['home'].short_name, match.teams['away'].short_name, match.score['home'], match.score['away'],
                    match.score['home']-match.score['away'],
                    match.scores['home'].count("try"),
@@ -200,95 +500,244 @@ class Tournament():
                   for match in self.matches if  match.scores==None]
         return pd.DataFrame(scores, columns=["home", "away", "home_score", "away_score", "difference", "home tries", "away tries"])
 
-    def league_table(self):
-        df = self.results_table()
-        df["Home P"] = 4*(df['home_score']>df['away_score'])
-        df["Away P"] = 4*(df['away_score']>df['home_score'])
-        df["Home W"] = 1*(df['home_score']>df['away_score'])
-        df["Away W"] = 1*(df['away_score']>df['home_score'])
-        df["Home L"] = 1*(df['home_score']<df['away_score'])
-        df["Away L"] = 1*(df['away_score']<df['home_score'])
-        # Draws
-        df["Home D"] = 1*(df['home_score']==df['away_score'])
-        df["Away D"] = 1*(df['away_score']==df['home_score'])
-        # Draw points
-        df["Home P"] += 2*(df['away_score']==df['home_score'])
-        df["Away P"] += 2*(df['away_score']==df['home_score'])
-        # Losing bonus
-        df["Away P"] += 1*((df['away_score']<df['home_score']) & ((df['home_score']-df['away_score'])<=7))
-        df["Home P"] += 1*((df['home_score']<df['away_score']) & ((df['away_score']-df['home_score'])<=7))
-        df["Away B"] = 1*((df['away_score']<df['home_score']) & ((df['home_score']-df['away_score'])<=7))
-        df["Home B"] = 1*((df['home_score']<df['away_score']) & ((df['away_score']-df['home_score'])<=7))
-        # Try bonus
-        df["Away P"] += 1*((df['away tries']>=4))
-        df["Away B"] += 1*((df['away tries']>=4))
-        df["Home P"] += 1*((df['home tries']>=4))
-        df["Home B"] += 1*((df['home tries']>=4))
-
-        points = []
-        for team in self.teams():
-            points.append({"team": team,
-                           "conference": self.team_conferences.get(team.short_name, "A"),
-                           "played": df[df.home==team.short_name].count()['Home P'] + df[df.away==team.short_name].count()['Away P'],
-                           "won": df[df.home==team.short_name].sum()['Home W'] + df[df.away==team.short_name].sum()['Away W'],
-                           "drawn": df[df.home==team.short_name].sum()['Home D'] + df[df.away==team.short_name].sum()['Away D'],
-                           "lost": df[df.home==team.short_name].sum()['Home L'] + df[df.away==team.short_name].sum()['Away L'],
-                           "for": df[df.home==team.short_name].sum()['home_score'] + df[df.away==team.short_name].sum()['away_score'],
-                           "against": df[df.home==team.short_name].sum()['away_score'] + df[df.away==team.short_name].sum()['home_score'],
-                           "bonus": df[df.home==team.short_name].sum()['Home B'] + df[df.away==team.short_name].sum()['Away B'],
-                           "points": df[df.home==team.short_name].sum()['Home P'] + df[df.away==team.short_name].sum()['Away P']})
-        league = pd.DataFrame(points)
+    STANDINGS = ["played", "won", "drawn", "lost", "for", "against", "bonus", "points"]
+
+    @staticmethod
+    def _rules_key(rules):
+        """Summarise the parts of a set of rules which the standings depend on."""
+        return tuple(sorted((key, value) for key, value in vars(rules).items() if key != "deductions"))
+
+    def _build_standings(self):
+        """
+        Total up the league standings for every completed match.
+
+        The standings are built the first time the league table is
+        needed, and are then updated as matches are added.
+        """
+        self.standings = {}
+        self._standings_key = self._rules_key(self.rules)
+        for match in self.matches:
+            self._update_standings(match, +1)
+
+    def _update_standings(self, match, sign):
+        """
+        Add a match's result to the standings, or remove it if ``sign`` is -1.
+        """
+        home, away = str(match.teams['home']), str(match.teams['away'])
+        scores = [match.score['home'], match.score['away']]
+        if match.scores == None:
+            tries = [np.nan, np.nan]
+        else:
+            tries = [match.scores['home'].count("try"), match.scores['away'].count("try")]
+        points = self.rules.match_points(scores, scores[::-1], tries)
+        for i, team in enumerate((home, away)):
+            contribution = [1, points['won'][i], points['drawn'][i], points['lost'][i],
+                            np.nan_to_num(scores[i]), np.nan_to_num(scores[1-i]),
+                            points['bonus'][i], points['points'][i]]
+            standing = self.standings.setdefault(team, [0] * len(self.STANDINGS))
+            for column, value in enumerate(contribution):
+                standing[column] += sign * value
+
+    def league_table(self, rules=None):
+        """
+        Produce the league table for this tournament.
+
+        With the tournament's own rules the table is read from the
+        standings, which are kept up to date as matches are added. With
+        other rules every result is split into one row for each side,
+        points are awarded to all of the rows at once, and the rows are
+        totalled for each team in a single grouped pass.
+
+        Parameters
+        ----------
+        rules : rugby.rules.Rules, optional
+           The rules used to award points. Defaults to the tournament's rules.
+        """
+        if rules is None or rules is self.rules:
+            rules = self.rules
+            if self.standings is None or self._standings_key != self._rules_key(rules):
+                self._build_standings()
+            totals = pd.DataFrame.from_dict(self.standings, orient="index", columns=self.STANDINGS)
+        else:
+            df = self.results_table()
+            sides = pd.DataFrame({
+                "team": np.concatenate([df['home'].values, df['away'].values]),
+                "for": np.concatenate([df['home_score'].values, df['away_score'].values]).astype(float),
+                "against": np.concatenate([df['away_score'].values, df['home_score'].values]).astype(float),
+            })
+            tries = np.concatenate([df['home tries'].values, df['away tries'].values]).astype(float)
+            sides = sides.assign(played=1, **rules.match_points(sides['for'], sides['against'], tries))
+            totals = sides.groupby("team")[self.STANDINGS].sum()
+
+        teams = self.teams()
+        totals = totals.reindex([team.short_name for team in teams]).fillna(0)
+        totals['for'] = totals['for'].astype(float)
+        totals['against'] = totals['against'].astype(float)
+        totals['deductions'] = [rules.deduction(team.short_name) for team in teams]
+        totals['points'] -= totals['deductions']
+        for column in ["played", "won", "drawn", "lost", "bonus", "deductions", "points"]:
+            totals[column] = totals[column].astype(int)
+
+        league = totals.reset_index(drop=True)
+        league.insert(0, "conference", [self.team_conferences.get(team.short_name, "A") for team in teams])
+        league.insert(0, "team", teams)
+        league = league[["team", "conference", "played", "won", "drawn", "lost",
+                         "for", "against", "bonus", "deductions", "points"]]
         league['diff'] = league['for'] - league['against']
-        league = league.sort_values(["conference"])\
-                       .sort_values(["points", "diff"], ascending=False)\
-                       .reset_index().drop(columns=['index'])
+        league = league.sort_values(["conference"], kind="mergesort")\
+                       .sort_values(["points", "diff"], ascending=False, kind="mergesort")\
+                       .reset_index(drop=True)
 
         return league
     
+    def simulate(self, seasons=10000, seed=None, processes=1, rules=None):
+        """
+        Simulate the remaining fixtures, and find how likely each team is to finish in each position.
+
+        See ``rugby.simulation.SeasonSimulation`` for the model and the
+        meaning of the arguments.
+
+        Returns
+        -------
+        pandas.DataFrame
+           The probability of each team finishing in each position.
+        """
+        return SeasonSimulation(self, rules=rules).run(seasons=seasons, seed=seed, processes=processes)
+
+    def ratings(self, prior=1.0):
+        """
+        Rate the teams from the results so far.
+
+        The ratings are fitted the first time they are needed, and are
+        then updated as matches are added. See ``rugby.ratings.Ratings``
+        for the model.
+
+        Returns
+        -------
+        rugby.ratings.Ratings
+           The ratings, which also give each team's rating on each date.
+        """
+        if self._ratings is None or self._ratings.prior != prior:
+            self._ratings = Ratings.from_tournament(self, prior=prior)
+        return self._ratings
+
+    def scenarios(self, rules=None):
+        """
+        Find the outcomes of the remaining fixtures which are still possible.
+
+        Returns
+        -------
+        rugby.scenarios.Scenarios
+           An object which can answer, for example, whether a team can
+           still finish in the top places and which results it needs.
+        """
+        return Scenarios(self, rules=rules)
+
     def lineup_summary(self):
         """
         Produce a full summary of the lineups for this tournament.
+
+        The teams are given by their short names.
         """
-        match_data = []
+        if self.columnar:
+            return self._table("lineups", lambda: self.store.lineup_summary())
+        return self._table("lineups", self._build_lineup_summary)
+
+    def _build_lineup_summary(self):
+        rows = {"level_0": [], "index": []}
+        columns = {}
+        teams = {"home": [], "away": [], "team": []}
+        length = 0
         for match in self.matches:
             if not hasattr(match, "lineups"):
                 continue
-                #return pd.DataFrame(columns=["name", "team", "home", "away", "game time"])
-            data = pd.concat([match.lineups['home'].lineup, match.lineups['away'].lineup])
-            teams = pd.DataFrame(np.array([[match.teams['home']] * 23 + [match.teams['away']] * 23]).T, columns=["team"])
-            home = pd.DataFrame(np.array([[match.teams['home']] * len(data), [match.teams['away']] * len(data)]).T, columns=["home", "away"])
-            home = home.join(teams)
-            data = data.reset_index().join(home)
-            data['position'] = data.index
-            match_data.append(data)
-        data = pd.concat(match_data).reset_index()
+            home, away = str(match.teams['home']), str(match.teams['away'])
+            start = length
+            for state, team in (("home", home), ("away", away)):
+                lineup = match.lineups[state]
+                size = len(lineup.names)
+                rows['index'].extend(lineup.numbers.tolist())
+                length = utils.append_columns(columns, {**lineup._columns, "game time": lineup.game_time}, length, size)
+                teams['team'] += [team] * size
+            rows['level_0'].extend(range(length - start))
+            teams['home'] += [home] * (length - start)
+            teams['away'] += [away] * (length - start)
+        data = pd.DataFrame({**rows, **columns, **teams})
+        data['position'] = data['level_0']
         return data
 
     def score_summary(self, squad=False):
         """
         Produce a summary of all the scoring events in this tournament.
+
+        Parameters
+        ----------
+        squad : bool, optional
+           Include every player in the lineups, whether or not they scored.
         """
-        match_data = []
+        if self.columnar:
+            return self._table(("scores", squad), lambda: self.store.score_summary(squad))
+        return self._table(("scores", squad), lambda: self._build_score_summary(squad))
+
+    def _build_score_summary(self, squad=False):
+        index = []
+        columns = {}
+        teams = {"home": [], "away": [], "team": []}
+        length = 0
         for match in self.matches:
             if not hasattr(match, "scores") or match.scores==None:
                 continue
-                #return pd.DataFrame(columns=["name", "team", "home", "away", "value"])
-            data = pd.concat([match.scores['home'].scores, match.scores['away'].scores]).reset_index()
-            if squad:
-                lineups = pd.concat([match.lineups['home'].lineup, match.lineups['away'].lineup]).reset_index()
-                data = pd.merge( lineups, data, how='outer',  right_on="player", left_on="name")
-            else:
-                data = data.rename(columns={"player": "name"})
-            teams = pd.DataFrame(np.array([[match.teams['home'].short_name] * len(match.scores['home'].scores) + [match.teams['away'].short_name] * len(match.scores['away'].scores)]).T, columns=["team"])
-            home = pd.DataFrame(np.array([[match.teams['home'].short_name] * len(data), [match.teams['away'].short_name] * len(data)]).T, columns=["home", "away"])
-            home = home.join(teams)
+            home, away = str(match.teams['home']), str(match.teams['away'])
+            start = length
             if squad:
-                data = data.join(home).reset_index().drop(columns=["player", "index_x", "index_y", "index"])
+                length = self._append_squad(columns, teams['team'], match, length)
             else:
-                data = data.join(home).reset_index().drop(columns=["level_0", "index"])
-            match_data.append(data)
-        data = pd.concat(match_data).reset_index()
-        return data
+                for state, team in (("home", home), ("away", away)):
+                    scores = match.scores[state]
+                    events = {"name" if name == "player" else name: values for name, values in scores.columns().items()}
+                    length = utils.append_columns(columns, events, length, len(scores))
+                    teams['team'] += [team] * len(scores)
+            index.extend(range(length - start))
+            teams['home'] += [home] * (length - start)
+            teams['away'] += [away] * (length - start)
+        return pd.DataFrame({"index": index, **columns, **teams})
+
+    @staticmethod
+    def _append_squad(columns, teams, match, length):
+        """
+        Add a row for each player in a match's lineups, and for each of their scoring events.
+
+        Players who did not score have a single row without an event, and
+        events by players who are not in either lineup are added at the end.
+        """
+        events = {}
+        order = []
+        for state in ("home", "away"):
+            scores = match.scores[state]
+            values = scores.columns()
+            values.pop("player", None)
+            rows = [{name: column[k] for name, column in values.items()} for k in range(len(scores))]
+            for player, row in zip(scores.player.tolist(), rows):
+                key = player if isinstance(player, str) else None
+                events.setdefault(key, []).append(row)
+                order.append((key, row, str(match.teams[state])))
+
+        used = set()
+        for state in ("home", "away"):
+            lineup = match.lineups[state]
+            players = {**lineup._columns, "game time": lineup.game_time}
+            players = [{name: column[k] for name, column in players.items()} for k in range(len(lineup.names))]
+            for name, player in zip(lineup.names, players):
+                key = name if isinstance(name, str) else None
+                for row in events.get(key, [{}]):
+                    used.add(id(row))
+                    length = utils.append_columns(columns, {name: [value] for name, value in {**player, **row}.items()}, length, 1)
+                    teams.append(str(match.teams[state]))
+        for key, row, team in order:
+            if id(row) not in used:
+                length = utils.append_columns(columns, {name: [value] for name, value in row.items()}, length, 1)
+                teams.append(team)
+        return length
 
     def player_score_table(self, team, squad=False):
         """
@@ -310,6 +759,58 @@ class Tournament():
         players_away = data[(data.team==team) & (data.home==team)].pivot_table(index="name", columns=["away"], values="game time", aggfunc="first")
         player_times = players_home.join(players_away, how="outer", lsuffix=" [H]", rsuffix=" [A]")
         return player_times
+
+    def player_summary(self):
+        """
+        Summarise the time every player spent on the field, and the points scored while they were on it.
+
+        Returns
+        -------
+        pandas.DataFrame
+           A row for each player in each team they played for, indexed
+           by the team's short name and the player's name, with the
+           number of matches they played in, their minutes, the points
+           scored for and against their team while they were on the
+           field, and those points per 80 minutes. Matches without
+           scoring events count towards the minutes but not the points.
+        """
+        return self._table("players", self._build_player_summary)
+
+    def _build_player_summary(self):
+        teams, names, minutes, points_for, points_against = [], [], [], [], []
+        for match in self.matches:
+            if not hasattr(match, "lineups"):
+                continue
+            scores = getattr(match, "scores", None)
+            for state, other in (("home", "away"), ("away", "home")):
+                lineup = match.lineups[state]
+                named = [isinstance(name, str) for name in lineup.names]
+                players = [name for name in lineup.names if isinstance(name, str)]
+                teams += [str(match.teams[state])] * len(players)
+                names += players
+                minutes.append(lineup.game_time[named])
+                if scores == None:
+                    points_for.append(np.full(len(players), np.nan))
+                    points_against.append(np.full(len(players), np.nan))
+                else:
+                    ranges = [lineup.time_ranges[name] for name in players]
+                    points_for.append(scores[state].points_in_times_each(ranges))
+                    points_against.append(scores[other].points_in_times_each(ranges))
+
+        columns = ["matches", "minutes", "points for", "points against", "for per 80", "against per 80"]
+        if len(names) == 0:
+            return pd.DataFrame(columns=columns, index=pd.MultiIndex.from_arrays([[], []], names=["team", "player"]))
+        data = pd.DataFrame({"team": teams, "player": names,
+                             "minutes": np.concatenate(minutes).astype(float),
+                             "points for": np.concatenate(points_for),
+                             "points against": np.concatenate(points_against)})
+        data['matches'] = data['minutes'] > 0
+        summary = data.groupby(["team", "player"]).sum()
+        summary['matches'] = summary['matches'].astype(int)
+        played = summary['minutes'].where(summary['minutes'] > 0)
+        summary['for per 80'] = 80 * summary['points for'] / played
+        summary['against per 80'] = 80 * summary['points against'] / played
+        return summary[columns]
     
     def scores(self):
         scores = []
@@ -332,8 +833,10 @@ class Tournament():
         matrix_against = np.zeros((len(players1), len(players2)))
         for match in self.matches:
             if {team1, team2} <= set(match.teams.values()):
-                for i, player1 in enumerate(players1):
-                    for j, player2 in enumerate(players2):
-                        matrix_for[i,j] += player1.onfield_point_mutual_rate(player2, match)[0]
-                        matrix_against[i,j] += player1.onfield_point_mutual_rate(player2, match)[1]
+                side, other = ("home", "away") if match.teams['home'] == team1 else ("away", "home")
+                rate_for, rate_against = mutual_rates([player.time_range(match) for player in players1],
+                                                      [player.time_range(match) for player in players2],
+                                                      match.scores[side], match.scores[other])
+                matrix_for += rate_for
+                matrix_against += rate_against
         return matrix_for, matrix_against, players1, players2
@@ -1,34 +1,140 @@
 import json
 
+import numpy as np
 import pandas as pd
 from datetime import datetime, date
 
-def determine_type(score):
-    """
-    Determine the type of score for a pandas Dataframe row.
-    """
-    if score['try'] > 0: return {'type': 'try', 'value': 5, 'minute': score['try'], 'player': score.player}
-    if score['conversion'] > 0: return {'type': 'conversion', 'value': 2, 'minute': score['conversion'], 'player': score.player}
-    if score['kick'] > 0: return {'type': 'kick', 'value': 3, 'minute': score['kick'], 'player': score.player}
-    if score['penalty'] > 0: return {'type': 'penalty', 'value': 3, 'minute': score['penalty'], 'player': score.player}
-    
+from . import intervals
+
+
+#: The scoring columns of a dense table, with the points for each. A row
+#: with more than one of them set is classed by the first.
+SCORE_COLUMNS = [("try", 5), ("conversion", 2), ("kick", 3), ("penalty", 3)]
+
+#: The position of each type of score in the scoring columns of a dense table.
+SCORE_INDEX = {"try": 0, "conversion": 1, "kick": 2, "drop goal": 2, "penalty": 3}
+
+#: The columns of a dense table, with one row for each player in a lineup and each scoring event.
+DENSE_COLUMNS = ["round", "date", "home_score", "away_score", "home", "away", "team", "player", "position",
+                 "on", "off", "yellow", "red", "try", "conversion", "kick", "penalty"]
+
+
 def json_serial(obj):
     """JSON serializer for objects not serializable by default json code"""
 
     if isinstance(obj, (datetime, date)):
         return obj.isoformat()
     raise TypeError ("Type %s not serializable" % type(obj))
-    
+
+
+def _dense_value(value):
+    """Represent a value in a dense table, leaving missing values empty."""
+    if isinstance(value, (list, tuple)):
+        return str(list(value))
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    return value
+
+
+def match_to_dense_rows(match, tround):
+    """
+    Produce the rows of a dense table for one match.
+
+    Each player in the lineups has a row for every score they made,
+    with the minute in the column for the type of score, or a single row
+    if they did not score. Scores by players who are not in the lineup
+    have a row of their own, and a match without lineups has a single
+    row with only its result.
+
+    Parameters
+    ----------
+    match : rugby.match.Match
+       The match.
+    tround : int
+       The round of the tournament the match was played in.
+    """
+    home, away = str(match.teams['home']), str(match.teams['away'])
+    common = [tround, match.date, _dense_value(match.score['home']), _dense_value(match.score['away']), home, away]
+    empty = [""] * 4
+    if not hasattr(match, "lineups"):
+        return [common + [""] * (len(DENSE_COLUMNS) - len(common))]
+
+    scores = getattr(match, "scores", None)
+    rows = []
+    for state in ("home", "away"):
+        lineup = match.lineups[state]
+        scored = {}
+        if scores != None:
+            side = scores[state]
+            for player, score_type, minute in zip(side.player, side.type, side.minute):
+                minutes = list(empty)
+                if score_type in SCORE_INDEX:
+                    minutes[SCORE_INDEX[score_type]] = _dense_value(minute)
+                scored.setdefault(player if isinstance(player, str) else None, []).append(minutes)
+        for k, (number, name) in enumerate(zip(lineup.numbers, lineup.names)):
+            player = [str(match.teams[state]), name, int(number)] \
+                + [_dense_value(lineup._columns[field][k]) for field in ("on", "off", "yellows", "reds")]
+            for minutes in scored.pop(name, [empty]):
+                rows.append(common + player + minutes)
+        for name, events in scored.items():
+            for minutes in events:
+                rows.append(common + [str(match.teams[state]), _dense_value(name), ""] + [""] * 4 + minutes)
+    return rows
+
+
 def dense_table_to_nested(data):
     """
     Convert a dense pandas dataframe to a nested, structured data format.
     """
-    
-    match_list = []
-    lineups_table = data.pivot_table(index=["round", "home", "away",  "team"], columns="position", values=["player", "on", "off", "red", "yellow"], aggfunc="first")
+    return pd.DataFrame(list(iter_dense_matches(data)))
+
+
+def iter_dense_matches(data):
+    """
+    Produce the nested record for each match in a dense table, one at a time.
+
+    The table is only partitioned once: the lineups are read from a
+    single pivot table, and the scoring events are grouped by the
+    teams which played and the team which scored.  As before, the
+    scoring events for a pairing of home and away teams are not
+    separated by round.
+    """
+    fields = ["player", "on", "off", "red", "yellow"]
+    lineups_table = data.pivot_table(index=["round", "home", "away",  "team"], columns="position", values=fields, aggfunc="first")
+    columns = {field: {} for field in fields}
+    for k, (field, position) in enumerate(lineups_table.columns):
+        columns[field][position] = k
+    nan = float("nan")
+    lineups = {}
+    for (tround, home, away, team), row in zip(lineups_table.index, lineups_table.to_numpy(dtype=object)):
+        lineup = {int(position): {"name": row[k],
+                                  "on": row[columns['on'][position]] if position in columns['on'] else nan,
+                                  "off": row[columns['off'][position]] if position in columns['off'] else nan,
+                                  "reds": row[columns['red'][position]] if position in columns['red'] else nan,
+                                  "yellows": row[columns['yellow'][position]] if position in columns['yellow'] else nan}
+                  for position, k in columns['player'].items()}
+        lineups.setdefault((tround, home, away), []).append((team, lineup))
+
+    scores = data[["try", "penalty", "conversion", "kick"]]
+    scoring = data[(scores.sum(axis=1) > 0).values]
+    events = {}
+    if len(scoring) > 0:
+        types = np.full(len(scoring), None, dtype=object)
+        for column, value in reversed(SCORE_COLUMNS):
+            types[(scoring[column] > 0).values] = column
+        minutes = {column: scoring[column].to_numpy(dtype=object) for column, value in SCORE_COLUMNS}
+        values = dict(SCORE_COLUMNS)
+        players = scoring['player'].to_numpy(dtype=object)
+        keys = zip(scoring['home'], scoring['away'], scoring['team'])
+        for k, key in enumerate(keys):
+            if types[k] is None:
+                event = None
+            else:
+                event = {'type': types[k], 'value': values[types[k]], 'minute': minutes[types[k]][k], 'player': players[k]}
+            events.setdefault(key, []).append(event)
 
     futures = data[pd.isna(data.home_score)].groupby(["round", "date",  "home", "away"])
-    for i, match in futures.first().iterrows():
+    for i in futures.size().index:
         match_dict = {}
         match_dict['tround'] = i[0]
         match_dict['teams'] = {"home": i[2], "away": i[3]}
@@ -36,10 +142,10 @@ def dense_table_to_nested(data):
         match_dict['away'] = {"team": i[3], "score": float("nan")}
         match_dict['date'] = pd.to_datetime(i[1])
         match_dict['stadium'] = ""
-        match_list.append(match_dict)
+        yield match_dict
     
     matches = data.groupby(["round", "date",  "home", "away", "home_score", "away_score"])
-    for i, match in matches.first().iterrows():
+    for i in matches.size().index:
         match_dict = {}
         match_dict['tround'] = i[0]
         match_dict['teams'] = {"home": i[2], "away": i[3]}
@@ -48,37 +154,22 @@ def dense_table_to_nested(data):
         match_dict['date'] = pd.to_datetime(i[1])
         match_dict['stadium'] = ""
 
-        if not (int(i[0]), i[2], i[3]) in lineups_table.index:
-            match_list.append(match_dict)
-        else:
-            for j, team in lineups_table.loc[(int(i[0]), i[2], i[3])].iterrows():
-
-                lineups = {}
-
-                lineup = pd.DataFrame(team.player).join(pd.DataFrame(team.on), rsuffix="_on").join(pd.DataFrame(team.off), rsuffix="_off").join(pd.DataFrame(team.red), rsuffix="_red").join(pd.DataFrame(team.yellow), rsuffix="_yellow")
-                lineup.columns=["name", "on", "off", "reds", "yellows"]
-                lineup.index = lineup.index.astype(int)
-                if j == i[2]:
-                    match_dict['home']['lineup'] = lineup.T.to_dict()
+        key = (int(i[0]), i[2], i[3])
+        if key in lineups:
+            for team, lineup in lineups[key]:
+                if team == i[2]:
+                    match_dict['home']['lineup'] = lineup
                 else:
-                    match_dict['away']['lineup'] = lineup.T.to_dict()
+                    match_dict['away']['lineup'] = lineup
 
-            scores = {}
             for team in match_dict['teams'].values():
-                events = data[(data.home==i[2]) & (data.away==i[3]) & (data.team==team)]
-                score_events = events[events[["try", "penalty", "conversion", "kick"]].sum(axis=1) > 0]
-                team_scores = []
-                for j, score in score_events.iterrows():
-                    team_scores.append(determine_type(score))
+                team_scores = list(events.get((i[2], i[3], team), []))
                 if team == i[2]:
                     match_dict['home']['scores'] = team_scores
                 else:
                     match_dict['away']['scores'] = team_scores
 
-            match_list.append(match_dict)
-
-    return pd.DataFrame(match_list)
-
+        yield match_dict
 
 
 def add_metadata(filename, **metadata):
@@ -100,29 +191,12 @@ def add_metadata(filename, **metadata):
 
 
 def intersections(a,b):
-    ranges = []
-    i = j = 0
-    while i < len(a) and j < len(b):
-        a_left, a_right = a[i]
-        b_left, b_right = b[j]
-
-        if a_right < b_right:
-            i += 1
-        else:
-            j += 1
-
-        if a_right >= b_left and b_right >= a_left:
-            end_pts = sorted([a_left, a_right, b_left, b_right])
-            middle = [end_pts[1], end_pts[2]]
-            ranges.append(middle)
-
-    ri = 0
-    while ri < len(ranges)-1:
-        if ranges[ri][1] == ranges[ri+1][0]:
-            ranges[ri:ri+2] = [[ranges[ri][0], ranges[ri+1][1]]]
-
-        ri += 1
-    return ranges
+    """
+    Find the time ranges which are in both of two lists of time ranges.
+
+    See ``rugby.intervals.intersection``.
+    """
+    return intervals.to_list(*intervals.intersection(intervals.to_arrays(a), intervals.to_arrays(b)))
 
 def total_time_from_ranges(subs):
     total_time = 0
@@ -131,3 +205,33 @@ def total_time_from_ranges(subs):
             time.append([subs[i], subs[i+1]])
             total_time += (subs[i+1] - subs[i])
     return time, total_time
+
+
+def append_columns(columns, values, length, size):
+    """
+    Add rows to a set of flat columns.
+
+    Parameters
+    ----------
+    columns : dict
+       The columns, as lists which all hold ``length`` rows.
+    values : dict
+       The new rows, as a list or array for each column.
+    length, size : int
+       The number of rows already in ``columns``, and the number being added.
+
+    Returns
+    -------
+    int
+       The new number of rows. A column which is only in one of
+       ``columns`` and ``values`` is filled with NaN for the other rows.
+    """
+    for key, column in values.items():
+        if key not in columns:
+            columns[key] = [np.nan] * length
+        columns[key].extend(column.tolist() if isinstance(column, np.ndarray) else column)
+    length += size
+    for column in columns.values():
+        if len(column) < length:
+            column.extend([np.nan] * (length - len(column)))
+    return length
@@ -0,0 +1,24 @@
+"""
+Check that a tournament loaded from the cache matches one parsed from its file.
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+import rugby
+from rugby.cache import TournamentCache
+from rugby.tournament import Tournament
+
+
+@pytest.mark.parametrize("validate", ["hash", "mtime"])
+def test_warm_load_matches_cold_load(tmp_path, validate):
+    path = os.path.join(rugby.__path__[0], "json_data", "super-rugby-aotearoa-2020.json")
+    cache = TournamentCache(str(tmp_path), validate=validate)
+    fresh = Tournament.from_json(path, cache=False)
+    Tournament.from_json(path, cache=cache)
+    assert len(os.listdir(tmp_path)) == 1
+    cached = Tournament.from_json(path, cache=cache)
+    for table in ("results_table", "lineup_summary", "score_summary", "league_table"):
+        pd.testing.assert_frame_equal(getattr(fresh, table)(), getattr(cached, table)())
@@ -0,0 +1,110 @@
+"""
+Check the batched player-pair covariance against a minute-by-minute count.
+
+The reference does not use ``rugby.intervals`` or ``rugby.covariance``:
+it marks the minutes each player was on the field on a grid, and counts
+the minutes and the scores where both players of a pair were on. The
+ends of every time range and the minute of every score in the bundled
+seasons are whole minutes, so the count is exact.
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+import rugby
+from rugby.tournament import Tournament
+
+SEASONS = ["Gallagher Premiership-2019-2020.json", "super-rugby-aotearoa-2020.json"]
+
+#: The grid covers the last minute of any range or score in the bundled seasons.
+MINUTES = 90
+
+
+def load(season):
+    tournament = Tournament.from_json(os.path.join(rugby.__path__[0], "json_data", season), cache=False)
+    return [match for match in tournament.matches if hasattr(match, "lineups") and match.scores != None]
+
+
+@pytest.fixture(scope="module", params=SEASONS)
+def matches(request):
+    return load(request.param)
+
+
+def on_field(lineup):
+    """
+    Mark each whole minute, and each minute mark, at which each player in a lineup was on the field.
+
+    Returns
+    -------
+    spans, marks : numpy.ndarray
+       With a row for each player: ``spans[p, m]`` is set if the player
+       was on from minute m to minute m + 1, and ``marks[p, m]`` if they
+       were on at minute m, including the minute they came on or went off.
+    """
+    spans = np.zeros((len(lineup.names), MINUTES), dtype=bool)
+    marks = np.zeros((len(lineup.names), MINUTES + 1), dtype=bool)
+    for p, name in enumerate(lineup.names):
+        for start, end in lineup.time_ranges[name]:
+            if np.isnan(start) or np.isnan(end):
+                continue
+            for minute in range(MINUTES + 1):
+                if start <= minute <= end:
+                    marks[p, minute] = True
+                if start <= minute and minute + 1 <= end:
+                    spans[p, minute] = True
+    return spans, marks
+
+
+def reference(match):
+    """Count the minutes and points for and against each pairing of a home and an away player."""
+    home_spans, home_marks = on_field(match.lineups['home'])
+    away_spans, away_marks = on_field(match.lineups['away'])
+    time = home_spans.astype(int) @ away_spans.T.astype(int)
+    points = []
+    for state in ("home", "away"):
+        total = np.zeros(time.shape)
+        scores = match.scores[state]
+        for minute, value in zip(scores.minute.astype(float), scores.value.astype(float)):
+            total += value * np.outer(home_marks[:, int(minute)], away_marks[:, int(minute)])
+        points.append(total)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = [np.where(time > 0, total / time, np.nan) for total in points]
+    return time, rates[0], rates[1]
+
+
+def test_covariance_matches_reference(matches):
+    for match in matches:
+        matrix_for, matrix_against = match.player_covariance()
+        _, expected_for, expected_against = reference(match)
+        np.testing.assert_allclose(matrix_for, expected_for, equal_nan=True)
+        np.testing.assert_allclose(matrix_against, expected_against, equal_nan=True)
+
+
+def test_pairs_never_together_are_nan(matches):
+    apart = 0
+    for match in matches:
+        matrix_for, matrix_against = match.player_covariance()
+        time, _, _ = reference(match)
+        assert np.array_equal(np.isnan(matrix_for), time == 0)
+        assert np.array_equal(np.isnan(matrix_against), time == 0)
+        apart += (time == 0).sum()
+    assert apart > 0
+
+
+def test_side_without_points_has_zero_rate():
+    """
+    A side which did not score has a rate of 0 with every pair who were on together.
+
+    The per-pair calculation this replaced gave NaN for these pairs.
+    """
+    match, = [match for match in load(SEASONS[0]) if match.score['away'] == 0]
+    assert len(match.scores['away']) == 0
+    matrix_for, matrix_against = match.player_covariance()
+    time, _, _ = reference(match)
+    together = time > 0
+    assert together.any() and not together.all()
+    assert np.all(matrix_against[together] == 0)
+    assert np.all(np.isnan(matrix_against[~together]))
+    assert np.all(matrix_for[together] >= 0) and matrix_for[together].max() > 0
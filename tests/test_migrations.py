@@ -0,0 +1,70 @@
+"""
+Check that the migrations add the lookup indexes, and that the hot lookups use them.
+"""
+
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import migrations
+from rugby.models import Base, Event, Match, Player, Position, Season, Team
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """A database in the state of one created before the indexes were added."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'rugby.db'}")
+    Base.metadata.create_all(engine)
+    with engine.connect() as connection:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                connection.execute(f"DROP INDEX {index.name}")
+    return engine
+
+
+def query_plan(session, query):
+    """Return the details of SQLite's query plan for an ORM query."""
+    compiled = query.statement.compile(dialect=session.bind.dialect)
+    parameters = [compiled.params[name] for name in compiled.positiontup]
+    rows = session.bind.execute(f"EXPLAIN QUERY PLAN {compiled}", parameters)
+    return " ".join(row[-1] for row in rows)
+
+
+def uses_index(plan):
+    return re.search(r"USING (COVERING )?INDEX", plan) is not None
+
+
+def lookups(session):
+    date = datetime(2020, 1, 4)
+    return {
+        "team": session.query(Team).filter_by(shortname="Sale"),
+        "fixture": session.query(Match).filter(Match.date.between(date, date + timedelta(days=1)))
+                                       .filter_by(home_id=1, away_id=2),
+        "season": session.query(Season).filter_by(name="2019-2020", tournament_id=1),
+        "season matches": session.query(Match).filter(Match.season_id == 1),
+        "player": session.query(Player).filter_by(firstname="Ben", surname="Youngs"),
+        "positions": session.query(Position).filter_by(match_id=1),
+        "events": session.query(Event).filter_by(match_id=1),
+    }
+
+
+def test_migrations_are_applied_once(engine):
+    assert migrations.migrate(engine) == ["create_tables", "create_indexes"]
+    assert migrations.migrate(engine) == []
+    with engine.connect() as connection:
+        assert migrations.schema_version(connection) == len(migrations.MIGRATIONS)
+
+
+def test_lookups_scan_without_indexes(engine):
+    session = sessionmaker(bind=engine)()
+    assert not uses_index(query_plan(session, lookups(session)["team"]))
+
+
+@pytest.mark.parametrize("lookup", ["team", "fixture", "season", "season matches", "player", "positions", "events"])
+def test_lookups_use_indexes(engine, lookup):
+    migrations.migrate(engine)
+    session = sessionmaker(bind=engine)()
+    assert uses_index(query_plan(session, lookups(session)[lookup]))
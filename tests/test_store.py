@@ -0,0 +1,47 @@
+"""
+Check that the tables built from the columnar store match those built from each match.
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+import rugby
+from rugby.tournament import Tournament
+
+SEASONS = ["Gallagher Premiership-2019-2020.json", "super-rugby-aotearoa-2020.json"]
+
+TABLES = {
+    "results": lambda tournament: tournament.results_table(),
+    "fixtures": lambda tournament: tournament.fixtures_table(),
+    "future": lambda tournament: tournament.fixtures_table(future=True),
+    "lineups": lambda tournament: tournament.lineup_summary(),
+    "scores": lambda tournament: tournament.score_summary(),
+    "squad": lambda tournament: tournament.score_summary(squad=True),
+}
+
+
+@pytest.fixture(scope="module", params=SEASONS)
+def path(request):
+    return os.path.join(rugby.__path__[0], "json_data", request.param)
+
+
+@pytest.mark.parametrize("table", list(TABLES))
+def test_columnar_tables_match(path, table):
+    matches = Tournament.from_json(path, cache=False)
+    columnar = Tournament.from_json(path, cache=False, columnar=True)
+    pd.testing.assert_frame_equal(TABLES[table](matches), TABLES[table](columnar))
+
+
+def test_store_from_csv(tmp_path):
+    """Seasons loaded from CSV have unnamed lineup places and plain team names."""
+    path = os.path.join(rugby.__path__[0], "json_data", SEASONS[0])
+    Tournament.from_json(path, cache=False).save_csv(str(tmp_path / "season.csv"))
+    matches = Tournament.from_csv(str(tmp_path / "season.csv"), "Premiership", "2019-2020", cache=False)
+    columnar = Tournament.from_csv(str(tmp_path / "season.csv"), "Premiership", "2019-2020", cache=False,
+                                   columnar=True)
+    assert columnar.store.appearances['player'].isna().any()
+    for table in ("lineups", "scores", "squad"):
+        pd.testing.assert_frame_equal(TABLES[table](matches), TABLES[table](columnar))
+    assert len(columnar.results_table()) == len(columnar.matches)